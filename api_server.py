@@ -1,18 +1,38 @@
 import os
 import json
+import asyncio
+import contextlib
+import uuid
+import httpx
 import uvicorn
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Body
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, Body, Header, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+import sys
+import time
 import shutil
+import argparse
+import subprocess
 from pathlib import Path
 
 # Import the unified agent
 from unified_agent import UnifiedAgent
 from document_processor import DocumentProcessor
 from vector_memory import VectorMemory
+from config import Config
+from llm_client import create_chat_client
+from context_builder import ContextBuilder
+from response_cleaner import ResponseCleaner
+from logging_config import configure_logging, get_logger
+from metrics import registry, start_trace, SamplingProfiler
+from shared_index import SnapshotWriterMemory, ReadOnlyVectorMemory
+from memory_shards import ShardManager, validate_tenant_id
+
+configure_logging()
+logger = get_logger("api_server")
 
 # Initialize FastAPI app
 app = FastAPI(title="Unified AI Agent API")
@@ -26,19 +46,162 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics
+http_requests = registry.counter("http_requests_total", "HTTP requests handled", labels=("method", "route", "status"))
+http_latency = registry.histogram("http_request_duration_seconds", "HTTP request latency", labels=("method", "route"))
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    if not registry.enabled and not Config.ENABLE_TRACING:
+        return await call_next(request)
+    
+    started = time.perf_counter()
+    with start_trace(f"{request.method} {request.url.path}") as trace:
+        response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    
+    # Label by route template so IDs in paths don't explode cardinality
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    if registry.enabled:
+        http_requests.inc(method=request.method, route=route_path, status=response.status_code)
+        http_latency.observe(elapsed, method=request.method, route=route_path)
+    if trace is not None:
+        # Streamed bodies (SSE chat, NDJSON listing) run after call_next returns; log the trace once they finish
+        response.headers["X-Trace-Id"] = trace.trace_id
+        response.body_iterator = _log_trace_after(response.body_iterator, trace)
+    if response.status_code >= 500:
+        logger.error("Request failed", extra={"method": request.method, "route": route_path, "status": response.status_code})
+    return response
+
+async def _log_trace_after(body_iterator, trace):
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        logger.debug("Request trace", extra={"trace": trace.to_dict()})
+
 # Initialize the agent
 agent = UnifiedAgent()
 
+# Share the agent's vector store so retention settings apply to what the agent searches
+if Config.SERVER_ROLE == "writer":
+    vector_memory = SnapshotWriterMemory()
+elif Config.SERVER_ROLE == "reader":
+    vector_memory = ReadOnlyVectorMemory()
+else:
+    vector_memory = getattr(agent, "vector_memory", None) or VectorMemory()
+if hasattr(agent, "vector_memory"):
+    agent.vector_memory = vector_memory
+
+# Per-tenant stores, selected with the X-Tenant-ID header or /api/tenants/{tenant_id}/...
+shard_manager = ShardManager()
+
+async def tenant_store(tenant_id=None, x_tenant_id=None, create=False):
+    """Return the requested tenant's store, or None for the default (agent) store.
+
+    Only adding a memory creates a shard; other requests for an unknown tenant get a 404.
+    """
+    tenant = tenant_id or x_tenant_id
+    if tenant is None:
+        return None
+    try:
+        validate_tenant_id(tenant)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Opening a cold shard reads its files, so keep it off the event loop
+    try:
+        return await run_in_threadpool(shard_manager.get, tenant, create)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Tenant not found: {tenant}")
+
+def is_tenant_request(request):
+    return request.url.path.startswith("/api/tenants") or "x-tenant-id" in request.headers
+
+# Reader workers forward memory writes to the single writer process
+writer_client = None
+
+def get_writer_client():
+    global writer_client
+    if writer_client is None:
+        writer_client = httpx.AsyncClient(base_url=Config.WRITER_URL, timeout=60.0)
+    return writer_client
+
+def is_writer_request(request):
+    # Access-time batches go straight from readers to the writer's loopback port, never through a reader
+    if request.url.path == "/api/memories/access":
+        return False
+    # Settings changes touch the retention policy, which only the writer enforces
+    if request.method in ("POST", "PUT", "DELETE") and request.url.path.startswith("/api/memories"):
+        return True
+    # Settings are read there too, so a GET after a PUT sees the change
+    if request.method in ("GET", "PUT") and request.url.path == "/api/settings":
+        return True
+    # Tenant shards live only in the writer; readers map just the default store
+    return is_tenant_request(request)
+
+@app.middleware("http")
+async def route_memory_writes(request: Request, call_next):
+    if Config.SERVER_ROLE != "reader":
+        return await call_next(request)
+    
+    if is_writer_request(request):
+        headers = {"content-type": request.headers.get("content-type", "application/json")}
+        if "x-tenant-id" in request.headers:
+            headers["x-tenant-id"] = request.headers["x-tenant-id"]
+        upstream = await get_writer_client().request(
+            request.method, request.url.path, params=request.query_params,
+            content=await request.body(), headers=headers
+        )
+        return Response(content=upstream.content, status_code=upstream.status_code,
+                        media_type=upstream.headers.get("content-type"))
+    
+    await run_in_threadpool(vector_memory.refresh)
+    return await call_next(request)
+
+async def flush_access_times():
+    """Forward the access times recorded by this reader so the writer's LRU retention sees them"""
+    accessed = vector_memory.drain_access()
+    if not accessed:
+        return
+    try:
+        response = await get_writer_client().post("/api/memories/access", json={"accessed": accessed})
+        response.raise_for_status()
+    except httpx.HTTPError:
+        vector_memory.requeue_access(accessed)
+        logger.warning("Could not forward memory access times", exc_info=True, extra={"pending": len(accessed)})
+
+async def access_flush_loop():
+    while True:
+        await asyncio.sleep(Config.ACCESS_FLUSH_INTERVAL)
+        await flush_access_times()
+
+# Model client and prompt assembly used for chat
+chat_client = create_chat_client()
+context_builder = ContextBuilder(vector_memory=vector_memory)
+response_cleaner = ResponseCleaner()
+
+# Gauges read at scrape time
+registry.gauge("vector_memory_index_size", "Vectors in the hot memory index", lambda: vector_memory.index.ntotal)
+registry.gauge("vector_memory_cold_memories", "Memories in the cold tier", lambda: len(vector_memory.cold_memories))
+registry.gauge("llm_active_requests", "Model requests in flight", lambda: chat_client.stats().get("pool", {}).get("active_requests", 0))
+
 # Create uploads directory if it doesn't exist
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
 
 # Models for request/response
+def new_conversation_id():
+    return uuid.uuid4().hex
+
 class MessageRequest(BaseModel):
     message: str
+    # Omitted IDs start a new conversation; send back the returned ID to continue it
+    conversation_id: str = Field(default_factory=new_conversation_id, min_length=1)
 
 class MessageResponse(BaseModel):
     response: str
+    conversation_id: str
 
 class MemoryItem(BaseModel):
     content: str
@@ -55,23 +218,185 @@ class SettingsUpdate(BaseModel):
     user_email: Optional[str] = None
     enable_vector_memory: Optional[bool] = None
     enable_document_processing: Optional[bool] = None
-    max_memory_items: Optional[int] = None
+    max_memory_items: Optional[int] = Field(None, ge=1)
+
+class MemoryAccessBatch(BaseModel):
+    accessed: Dict[int, str]  # memory ID -> ISO timestamp of the latest access
+
+access_flush_task = None
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global access_flush_task
+    if Config.MEMORY_COLLAPSE_ON_START and Config.SERVER_ROLE != "reader" and vector_memory.deduplicate:
+        removed = await run_in_threadpool(vector_memory.collapse_duplicates)
+        if removed:
+            logger.info("Collapsed duplicate memories", extra={"removed": removed})
+    vector_memory.start_retention_worker()
+    if Config.SERVER_ROLE == "reader":
+        access_flush_task = asyncio.ensure_future(access_flush_loop())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    vector_memory.stop_retention_worker()
+    if access_flush_task is not None:
+        access_flush_task.cancel()
+        await flush_access_times()
+    if writer_client is not None:
+        await writer_client.aclose()
+    await chat_client.aclose()
 
 # Routes
 @app.get("/")
 async def read_root():
     return {"message": "Unified AI Agent API is running"}
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profile")
+async def profile(seconds: float = 5.0):
+    if not Config.ENABLE_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    profiler = SamplingProfiler()
+    profiler.start()
+    await asyncio.sleep(min(seconds, 60.0))
+    return PlainTextResponse(profiler.stop())
+
 # Chat endpoints
 @app.post("/api/chat", response_model=MessageResponse)
 async def chat(request: MessageRequest):
     try:
-        # Process the message through the unified agent
-        response = agent.process_message(request.message)
-        return {"response": response}
+        if not Config.CHAT_USE_MODEL_CLIENT:
+            # Process the message through the unified agent without blocking the event loop
+            response = await run_in_threadpool(agent.process_message, request.message)
+            return {"response": response, "conversation_id": request.conversation_id}
+        
+        # Pooled, coalesced and cached model call with the same prompt assembly as streamed chat
+        messages, _ = await run_in_threadpool(build_chat_messages, request.message, request.conversation_id)
+        response = response_cleaner.clean(await chat_client.complete(messages, model=getattr(agent, "model", None)))
+        record_chat_turn(request.message, response, request.conversation_id)
+        return {"response": response, "conversation_id": request.conversation_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def build_chat_messages(message, conversation_id):
+    """Assemble the model prompt from the conversation's own history; returns (messages, report)"""
+    return context_builder.build(message, conversation_id=conversation_id)
+
+def record_chat_turn(message, response, conversation_id):
+    """Append an exchange to its conversation's history"""
+    context_builder.record_turn(conversation_id, message, response)
+
+def require_streaming():
+    if not Config.ENABLE_STREAMING:
+        raise HTTPException(status_code=404, detail="Streaming is disabled")
+
+def sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: MessageRequest, http_request: Request):
+    require_streaming()
+    messages, context_report = await run_in_threadpool(build_chat_messages, request.message, request.conversation_id)
+    
+    async def generate():
+        tokens = []
+        cleaner = response_cleaner.stream(Config.STREAM_CLEANUP_MODE)
+        stream = chat_client.stream_chat(messages, model=getattr(agent, "model", None))
+        try:
+            async for token in stream:
+                # Stop pulling from the model as soon as the client goes away
+                if await http_request.is_disconnected():
+                    return
+                token = cleaner.feed(token)
+                if token:
+                    tokens.append(token)
+                    yield sse_event({"token": token})
+            token = cleaner.finish()
+            if token:
+                tokens.append(token)
+                yield sse_event({"token": token})
+            record_chat_turn(request.message, "".join(tokens), request.conversation_id)
+            yield sse_event({"response": "".join(tokens), "conversation_id": request.conversation_id, "context": context_report}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+        finally:
+            await stream.aclose()
+    
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Conversation-Id": request.conversation_id})
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    return chat_client.stats()
+
+async def forward_tokens(websocket, message, conversation_id):
+    tokens = []
+    messages, context_report = await run_in_threadpool(build_chat_messages, message, conversation_id)
+    cleaner = response_cleaner.stream(Config.STREAM_CLEANUP_MODE)
+    stream = chat_client.stream_chat(messages, model=getattr(agent, "model", None))
+    try:
+        async for token in stream:
+            token = cleaner.feed(token)
+            if token:
+                tokens.append(token)
+                await websocket.send_json({"type": "token", "content": token})
+    finally:
+        await stream.aclose()
+    token = cleaner.finish()
+    if token:
+        tokens.append(token)
+        await websocket.send_json({"type": "token", "content": token})
+    record_chat_turn(message, "".join(tokens), conversation_id)
+    await websocket.send_json({"type": "done", "response": "".join(tokens), "conversation_id": conversation_id, "context": context_report})
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    await websocket.accept()
+    if not Config.ENABLE_STREAMING:
+        await websocket.close(code=1008, reason="Streaming is disabled")
+        return
+    
+    # Messages without a conversation_id continue this connection's own conversation
+    connection_conversation_id = new_conversation_id()
+    try:
+        pending = None
+        while True:
+            data = pending if pending is not None else await websocket.receive_json()
+            pending = None
+            sender = asyncio.create_task(forward_tokens(websocket, data.get("message", ""), data.get("conversation_id") or connection_conversation_id))
+            receiver = asyncio.create_task(websocket.receive_json())
+            
+            # Any message while streaming (or a disconnect) cancels the current response
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done:
+                receiver.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await receiver
+                sender.result()
+                continue
+            
+            # Let the cancelled stream finish its send and close the model stream before answering
+            sender.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sender
+            if isinstance(receiver.exception(), WebSocketDisconnect):
+                return
+            await websocket.send_json({"type": "cancelled"})
+            
+            # A message that interrupted the stream is answered next; one without "message" only cancels
+            interrupt = receiver.result()
+            if interrupt.get("message"):
+                pending = interrupt
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1011)
+
 # Document endpoints
 @app.post("/api/documents/upload")
 async def upload_document(file: UploadFile = File(...)):
@@ -83,9 +408,9 @@ async def upload_document(file: UploadFile = File(...)):
         
         # Process the document based on its type
         if file.filename.lower().endswith(".pdf"):
-            text = agent.document_processor.extract_text_from_pdf(str(file_path))
+            text = await run_in_threadpool(agent.document_processor.extract_text_from_pdf, str(file_path))
         elif file.filename.lower().endswith((".jpg", ".jpeg", ".png", ".bmp", ".gif")):
-            text = agent.document_processor.perform_ocr(str(file_path))
+            text = await run_in_threadpool(agent.document_processor.perform_ocr, str(file_path))
         else:
             # For other document types, try to read as text
             with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
@@ -131,9 +456,9 @@ async def get_document(document_id: str):
         file_path = document["path"]
         if os.path.exists(file_path):
             if file_path.lower().endswith(".pdf"):
-                document["content"] = agent.document_processor.extract_text_from_pdf(file_path)
+                document["content"] = await run_in_threadpool(agent.document_processor.extract_text_from_pdf, file_path)
             elif file_path.lower().endswith((".jpg", ".jpeg", ".png", ".bmp", ".gif")):
-                document["content"] = agent.document_processor.perform_ocr(file_path)
+                document["content"] = await run_in_threadpool(agent.document_processor.perform_ocr, file_path)
             else:
                 with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
                     document["content"] = f.read()
@@ -166,49 +491,147 @@ async def delete_document(document_id: str):
 
 # Memory endpoints
 @app.get("/api/memories")
-async def get_memories(tag: Optional[str] = None):
+@app.get("/api/tenants/{tenant_id}/memories")
+async def get_memories(tag: Optional[str] = None, cursor: Optional[int] = None,
+                       limit: Optional[int] = Query(None, ge=1, le=Config.MEMORY_MAX_PAGE_SIZE),
+                       fields: Optional[str] = None, truncate: Optional[int] = Query(None, ge=0), stream: bool = False,
+                       tenant_id: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    shard = await tenant_store(tenant_id, x_tenant_id)
+    store = shard or vector_memory
     try:
-        memories = agent.get_memories(tag)
-        return memories
+        # Without paging options keep the original full-array response
+        if cursor is None and limit is None and fields is None and truncate is None and not stream:
+            if shard is not None:
+                return await run_in_threadpool(shard.search_by_tag, tag) if tag else shard.get_all_memories()
+            memories = await run_in_threadpool(agent.get_memories, tag)
+            return memories
+        
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        
+        if stream:
+            # NDJSON: one memory per line, serialized as it is read
+            def generate():
+                for memory in store.iter_memories(field_list, truncate, tag):
+                    yield json.dumps(memory) + "\n"
+            return StreamingResponse(generate(), media_type="application/x-ndjson")
+        
+        page_size = min(limit or Config.MEMORY_PAGE_SIZE, Config.MEMORY_MAX_PAGE_SIZE)
+        return store.get_memories_page(cursor, page_size, field_list, truncate, tag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/memories/stats")
+@app.get("/api/tenants/{tenant_id}/memories/stats")
+async def get_memory_stats(tenant_id: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    store = await tenant_store(tenant_id, x_tenant_id) or vector_memory
+    try:
+        stats = store.get_memory_stats()
+        stats.update(store.get_storage_stats())
+        return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/memories")
-async def add_memory(memory: MemoryItem):
+@app.post("/api/tenants/{tenant_id}/memories")
+async def add_memory(memory: MemoryItem, tenant_id: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    store = await tenant_store(tenant_id, x_tenant_id, create=True) or vector_memory
+    try:
+        memory_id, created = await run_in_threadpool(store.add_or_merge_memory, memory.content, memory.tags)
+        if not created:
+            return {"id": memory_id, "deduplicated": True, "duplicate_of": memory_id,
+                    "message": "Duplicate of an existing memory; not added"}
+        return {"id": memory_id, "deduplicated": False, "message": "Memory added successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/memories/deduplicate")
+@app.post("/api/tenants/{tenant_id}/memories/deduplicate")
+async def deduplicate_memories(tenant_id: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    """Merge duplicates that were stored before deduplication was enabled"""
+    store = await tenant_store(tenant_id, x_tenant_id) or vector_memory
     try:
-        memory_id = agent.add_memory(memory.content, memory.tags)
-        return {"id": memory_id, "message": "Memory added successfully"}
+        removed = await run_in_threadpool(store.collapse_duplicates)
+        return {"removed": removed}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+if Config.SERVER_ROLE == "writer":
+    @app.post("/api/memories/access")
+    async def record_memory_access(batch: MemoryAccessBatch):
+        """Access times forwarded by reader workers (multi-worker mode only)"""
+        try:
+            updated = await run_in_threadpool(vector_memory.record_access, batch.accessed)
+            return {"updated": updated}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
 @app.put("/api/memories/{memory_id}")
-async def update_memory(memory_id: str, memory: MemoryUpdateItem):
+@app.put("/api/tenants/{tenant_id}/memories/{memory_id}")
+async def update_memory(memory_id: str, memory: MemoryUpdateItem, tenant_id: Optional[str] = None,
+                        x_tenant_id: Optional[str] = Header(None)):
+    shard = await tenant_store(tenant_id, x_tenant_id)
     try:
-        success = agent.update_memory(memory_id, memory.content, memory.tags)
+        if shard is not None:
+            success = memory_id.isdigit() and await run_in_threadpool(shard.update_memory, int(memory_id), memory.content, memory.tags)
+        else:
+            success = await run_in_threadpool(agent.update_memory, memory_id, memory.content, memory.tags)
         if not success:
             raise HTTPException(status_code=404, detail="Memory not found")
         return {"message": "Memory updated successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/memories/{memory_id}")
-async def delete_memory(memory_id: str):
+@app.delete("/api/tenants/{tenant_id}/memories/{memory_id}")
+async def delete_memory(memory_id: str, tenant_id: Optional[str] = None, x_tenant_id: Optional[str] = Header(None)):
+    shard = await tenant_store(tenant_id, x_tenant_id)
     try:
-        success = agent.delete_memory(memory_id)
+        if shard is not None:
+            success = memory_id.isdigit() and await run_in_threadpool(shard.delete_memory, int(memory_id))
+        else:
+            success = await run_in_threadpool(agent.delete_memory, memory_id)
         if not success:
             raise HTTPException(status_code=404, detail="Memory not found")
         return {"message": "Memory deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/memories/search")
-async def search_memories(query: str):
+@app.get("/api/tenants/{tenant_id}/memories/search")
+async def search_memories(query: str, include_cold: bool = False, tenant_id: Optional[str] = None,
+                          x_tenant_id: Optional[str] = Header(None)):
+    shard = await tenant_store(tenant_id, x_tenant_id)
     try:
-        results = agent.search_memories(query)
+        if shard is not None:
+            results = await run_in_threadpool(shard.search_memories, query, include_cold=include_cold)
+        elif include_cold:
+            # Demoted memories are only scanned on demand
+            results = await run_in_threadpool(vector_memory.search_memories, query, include_cold=True)
+        else:
+            results = await run_in_threadpool(agent.search_memories, query)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/tenants")
+async def get_tenants():
+    return {"tenants": shard_manager.tenants(), **shard_manager.stats()}
+
+@app.get("/api/tenants/search")
+async def search_tenants(query: str, k: int = 5, tenants: Optional[str] = None, include_cold: bool = False):
+    """Fan out over tenant shards (all, or a comma-separated list) and merge the top k"""
+    tenant_ids = [tenant.strip() for tenant in tenants.split(",") if tenant.strip()] if tenants else None
+    try:
+        return await run_in_threadpool(shard_manager.search_all, query, k, tenant_ids, include_cold)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Settings endpoints
 @app.get("/api/settings")
 async def get_settings():
@@ -221,7 +644,7 @@ async def get_settings():
             "user_email": agent.user_info.get("email", "") if hasattr(agent, "user_info") else "",
             "enable_vector_memory": True,
             "enable_document_processing": True,
-            "max_memory_items": 100,
+            "max_memory_items": vector_memory.retention_policy.max_items,
         }
         return settings
     except Exception as e:
@@ -248,6 +671,11 @@ async def update_settings(settings: SettingsUpdate):
                 if settings.user_email:
                     agent.user_info["email"] = settings.user_email
         
+        if settings.max_memory_items is not None:
+            # Shrinking the cap is applied incrementally by the retention worker
+            vector_memory.retention_policy.max_items = settings.max_memory_items
+            vector_memory.schedule_retention()
+        
         # Other settings can be implemented similarly
         
         return {"message": "Settings updated successfully"}
@@ -288,6 +716,33 @@ def save_documents_metadata(documents):
     with open(metadata_path, "w") as f:
         json.dump(documents, f, indent=2)
 
+def run_multi_worker(workers, host, port, writer_port):
+    """Start one writer process and `workers` reader processes sharing memory-mapped snapshots"""
+    writer_env = dict(os.environ, NEXUS_ROLE="writer", NEXUS_SNAPSHOT_DIR=Config.SNAPSHOT_DIR)
+    writer = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api_server:app", "--host", "127.0.0.1", "--port", str(writer_port)],
+        env=writer_env
+    )
+    
+    # uvicorn forks the readers from this process, so they inherit the role via the environment
+    os.environ.update(NEXUS_ROLE="reader", NEXUS_SNAPSHOT_DIR=Config.SNAPSHOT_DIR,
+                      NEXUS_WRITER_URL=f"http://127.0.0.1:{writer_port}")
+    try:
+        uvicorn.run("api_server:app", host=host, port=port, workers=workers)
+    finally:
+        writer.terminate()
+        writer.wait()
+
 # Run the server
 if __name__ == "__main__":
-    uvicorn.run("api_server:app", host="0.0.0.0", port=8000, reload=True)
+    parser = argparse.ArgumentParser(description="Unified AI Agent API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="Reader workers; more than 1 enables the shared-snapshot mode")
+    parser.add_argument("--writer-port", type=int, default=8001)
+    args = parser.parse_args()
+    
+    if args.workers > 1:
+        run_multi_worker(args.workers, args.host, args.port, args.writer_port)
+    else:
+        uvicorn.run("api_server:app", host=args.host, port=args.port, reload=True)
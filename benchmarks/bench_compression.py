@@ -0,0 +1,110 @@
+"""Index bytes, rebuild peak RSS, search latency and recall@k of compressed indexes versus the flat index.
+
+Each case is built in a fresh subprocess so its peak RSS is not polluted by the others.
+
+Usage:
+    python benchmarks/bench_compression.py --memories 100000 --k 10
+"""
+import os
+import random
+import resource
+import argparse
+import multiprocessing
+
+from common import measure, temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from config import Config
+from bench_vector_memory import VOCABULARY, TAGS, synthetic_text
+
+# name -> (index type, re-rank, rebuild batch size; 0 vectorizes everything at once like the old rebuild)
+CASES = {
+    "flat_unbatched": ("flat", False, 0),
+    "flat": ("flat", False, Config.MEMORY_REBUILD_BATCH_SIZE),
+    "sq16": ("sq16", False, Config.MEMORY_REBUILD_BATCH_SIZE),
+    "sq16_rerank": ("sq16", True, Config.MEMORY_REBUILD_BATCH_SIZE),
+    "pq": ("pq", False, Config.MEMORY_REBUILD_BATCH_SIZE),
+    "pq_rerank": ("pq", True, Config.MEMORY_REBUILD_BATCH_SIZE)
+}
+
+
+def _build_case(index_type, rerank, batch_size, memories, queries, k, seed, results):
+    from vector_memory import VectorMemory, RetentionPolicy
+
+    Config.MEMORY_REBUILD_BATCH_SIZE = batch_size
+    rng = random.Random(seed)
+    with temporary_workdir():
+        store = VectorMemory(retention_policy=RetentionPolicy(), deduplicate=False, index_type=index_type, rerank=rerank)
+        timestamp = "2025-01-01T00:00:00"
+        store.memories = [
+            {"id": i + 1, "content": synthetic_text(rng), "tags": rng.sample(TAGS, 2), "source": "benchmark",
+             "created_at": timestamp, "last_accessed": timestamp}
+            for i in range(memories)
+        ]
+        store.memory_ids = [mem["id"] for mem in store.memories]
+        store._reset_bookkeeping()
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        store._rebuild_index()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        store.save_index()
+
+        # Keep the search loop from rewriting the memories file
+        store.save_memories = lambda: None
+        hits = [[mem["id"] for mem in store.search_memories(query, k=k)] for query in queries]
+        results.put({
+            "index_class": type(store.index).__name__,
+            "index_bytes": os.path.getsize(store.index_file),
+            "embedding_bytes": os.path.getsize(store.embedding_file) if os.path.exists(store.embedding_file) else 0,
+            "rebuild_peak_rss_kb": rss_after,
+            "rebuild_rss_growth_kb": rss_after - rss_before,
+            "search": measure(lambda i: store.search_memories(queries[i % len(queries)], k=k), len(queries)),
+            "hits": hits
+        })
+
+
+def run(memories=20000, k=10, queries=100, cases=None, seed=0):
+    rng = random.Random(seed + 1)
+    query_texts = [synthetic_text(rng, 8) for _ in range(queries)]
+    context = multiprocessing.get_context("spawn")
+
+    results = {"memories": memories, "k": k, "vocabulary": len(VOCABULARY)}
+    for name in cases or CASES:
+        index_type, rerank, batch_size = CASES[name]
+        queue = context.Queue()
+        worker = context.Process(target=_build_case, args=(index_type, rerank, batch_size, memories, query_texts, k, seed, queue))
+        worker.start()
+        results[name] = queue.get()
+        worker.join()
+
+    # Recall@k against the exact flat index
+    reference = results["flat"]["hits"] if "flat" in results else None
+    for name in cases or CASES:
+        case = results[name]
+        hits = case.pop("hits")
+        if reference is not None:
+            found = sum(len(set(expected) & set(got)) for expected, got in zip(reference, hits))
+            case["recall_at_k"] = found / max(1, sum(len(expected) for expected in reference))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=20000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    args = parser.parse_args()
+
+    if "flat" not in args.cases:
+        args.cases.insert(0, "flat")
+    results = run(args.memories, args.k, args.queries, args.cases)
+    print(f"memories={results['memories']} k={results['k']}")
+    for name in args.cases:
+        case = results[name]
+        print(f"  {name:15} index={case['index_bytes'] / 1e6:8.2f}MB vectors={case['embedding_bytes'] / 1e6:8.2f}MB "
+              f"rebuild_peak={case['rebuild_peak_rss_kb'] / 1024:7.1f}MB (+{case['rebuild_rss_growth_kb'] / 1024:.1f}MB) "
+              f"search_p50={case['search']['p50_ms']:.2f}ms recall@k={case.get('recall_at_k', 0):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""DocumentProcessor text extraction on generated PDFs and images.
+
+Usage:
+    python benchmarks/bench_documents.py --pages 1 10 50
+"""
+import random
+import argparse
+
+from common import measure, temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from document_processor import DocumentProcessor
+
+WORDS = ("resume experience education skills python project team lead data analysis report summary "
+         "university degree bachelor master engineering system design api memory search").split()
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages, lines_per_page=40, seed=0):
+    """Write a minimal text PDF (Helvetica, one text stream per page) without external libraries"""
+    rng = random.Random(seed)
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(None)  # filled in once the page objects exist
+    page_ids = []
+    for _ in range(pages):
+        text_lines = [" ".join(rng.choice(WORDS) for _ in range(10)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 40 760 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in text_lines) + " ET"
+        stream_bytes = stream.encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def write_image(path, lines=20, seed=0):
+    """Render random text lines into a PNG for OCR"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (1200, 40 + lines * 30), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(lines):
+        draw.text((20, 20 + i * 30), " ".join(rng.choice(WORDS) for _ in range(8)), fill="black")
+    image.save(path)
+
+
+def ocr_available():
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def run(pages=(1, 10), iterations=5, image_lines=(10, 40)):
+    results = {}
+    with temporary_workdir():
+        processor = DocumentProcessor()
+        for page_count in pages:
+            path = f"bench_{page_count}.pdf"
+            write_pdf(path, page_count)
+            results[f"pdf_{page_count}_pages"] = measure(lambda i: processor.extract_text_from_pdf(path), iterations)
+
+        if ocr_available():
+            for line_count in image_lines:
+                path = f"bench_{line_count}.png"
+                write_image(path, line_count)
+                results[f"ocr_{line_count}_lines"] = measure(lambda i: processor.perform_ocr(path), iterations)
+        else:
+            results["ocr"] = {"skipped": "tesseract is not installed"}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, summary in run(args.pages, args.iterations).items():
+        if "skipped" in summary:
+            print(f"{name:16} skipped: {summary['skipped']}")
+        else:
+            print(f"{name:16} p50={summary['p50_ms']:.2f}ms p95={summary['p95_ms']:.2f}ms throughput={summary['throughput']:.2f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Model client against an in-process stub: retries, coalescing, cancellation, cache and pooled throughput.
+
+The stub is an httpx.MockTransport, so no network or API key is needed. Each
+scenario checks the client's behaviour before its numbers are reported.
+
+Usage:
+    python benchmarks/bench_llm_client.py --requests 500 --concurrency 50
+"""
+import time
+import json
+import asyncio
+import argparse
+
+from common import summarize, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+import httpx
+
+from llm_client import OpenRouterClient
+
+
+class StubModel:
+    """Answers chat completions after a delay; the first fail_first calls per prompt return 503"""
+    def __init__(self, delay=0.01, fail_first=0):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.calls = 0
+        self._failures = {}
+
+    async def __call__(self, request):
+        self.calls += 1
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        await asyncio.sleep(self.delay)
+        if self._failures.get(prompt, 0) < self.fail_first:
+            self._failures[prompt] = self._failures.get(prompt, 0) + 1
+            return httpx.Response(503, json={"error": "unavailable"})
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"echo {prompt}"}}]})
+
+
+def make_client(stub, **kwargs):
+    return OpenRouterClient(api_key="stub", api_url="http://stub/chat", transport=httpx.MockTransport(stub), **kwargs)
+
+
+def prompt(text):
+    return [{"role": "user", "content": text}]
+
+
+async def check_coalescing(callers):
+    stub = StubModel(delay=0.05)
+    client = make_client(stub, cache_ttl=0)
+    results = await asyncio.gather(*(client.complete(prompt("same")) for _ in range(callers)))
+    await client.aclose()
+    assert results == ["echo same"] * callers, results
+    assert stub.calls == 1, f"{callers} identical prompts made {stub.calls} upstream calls"
+    return {"callers": callers, "upstream_calls": stub.calls, "coalesced": client.stats()["coalesced"]}
+
+
+async def check_cancelled_leader():
+    stub = StubModel(delay=0.05)
+    client = make_client(stub, cache_ttl=0)
+    leader = asyncio.ensure_future(client.complete(prompt("shared")))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(client.complete(prompt("shared")))
+    await asyncio.sleep(0.01)
+    # A disconnecting leader must not take the coalesced followers down with it
+    leader.cancel()
+    result = await follower
+    await client.aclose()
+    assert leader.cancelled()
+    assert result == "echo shared", result
+    return {"follower_result": result, "upstream_calls": stub.calls}
+
+
+async def check_retries(requests):
+    stub = StubModel(delay=0.0, fail_first=2)
+    client = make_client(stub, cache_ttl=0, max_retries=3, backoff=0.001)
+    results = await asyncio.gather(*(client.complete(prompt(f"retry {i}")) for i in range(requests)))
+    await client.aclose()
+    assert results == [f"echo retry {i}" for i in range(requests)]
+    assert client.stats()["retries"] == 2 * requests, client.stats()
+    return {"requests": requests, "upstream_calls": stub.calls, "retries": client.stats()["retries"]}
+
+
+async def check_cache(requests):
+    stub = StubModel(delay=0.01)
+    client = make_client(stub, cache_ttl=60)
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        assert await client.complete(prompt(f"cached {i % 10}")) == f"echo cached {i % 10}"
+        samples.append(time.perf_counter() - started)
+    await client.aclose()
+    assert stub.calls == min(10, requests), stub.calls
+    return {"upstream_calls": stub.calls, "hit_rate": client.stats()["cache"]["hit_rate"], "latency": summarize(samples)}
+
+
+async def pooled_throughput(requests, concurrency, delay):
+    stub = StubModel(delay=delay)
+    client = make_client(stub, cache_ttl=0, max_connections=concurrency, max_concurrency_per_model=concurrency)
+    counter = iter(range(requests))
+    samples = []
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            await client.complete(prompt(f"distinct {i}"))
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(samples, time.perf_counter() - started)
+    summary["peak_active_requests"] = client.stats()["pool"]["peak_active_requests"]
+    await client.aclose()
+    return summary
+
+
+async def run_scenarios(requests, concurrency, delay):
+    return {
+        "coalescing": await check_coalescing(concurrency),
+        "cancelled_leader": await check_cancelled_leader(),
+        "retries": await check_retries(min(requests, 50)),
+        "cache": await check_cache(requests),
+        "pooled": await pooled_throughput(requests, concurrency, delay)
+    }
+
+
+def run(requests=200, concurrency=20, delay=0.005):
+    return asyncio.run(run_scenarios(requests, concurrency, delay))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.005, help="Stub response time in seconds")
+    args = parser.parse_args()
+
+    results = run(args.requests, args.concurrency, args.delay)
+    for name, result in results.items():
+        print(f"{name:18} {json.dumps(result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Search throughput and per-process memory with P reader processes sharing one mapped snapshot.
+
+Usage:
+    python benchmarks/bench_multiworker.py --memories 100000 --processes 1 2 4 8
+"""
+import os
+import time
+import random
+import argparse
+import multiprocessing
+
+from common import temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from bench_vector_memory import populate, synthetic_text
+from vector_memory import RetentionPolicy
+from shared_index import SnapshotWriterMemory, ReadOnlyVectorMemory
+
+
+def memory_status():
+    """Resident memory split into anonymous (private heap) and file-backed (mapped, shareable) kB"""
+    status = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile"):
+                    status[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return {
+        "rss_kb": status.get("VmRSS", 0),
+        "anon_kb": status.get("RssAnon", 0),
+        "file_kb": status.get("RssFile", 0)
+    }
+
+
+def _reader(snapshot_root, queries, k, ready, start, results):
+    before = memory_status()
+    store = ReadOnlyVectorMemory(snapshot_root=snapshot_root, poll_interval=3600)
+    # Warm the mapping so the RSS numbers include the whole index
+    for query in queries[:5]:
+        store.search_memories(query, k=k)
+    ready.put(None)
+    start.wait()
+
+    started = time.perf_counter()
+    for query in queries:
+        store.search_memories(query, k=k)
+    elapsed = time.perf_counter() - started
+
+    after = memory_status()
+    results.put({
+        "elapsed": elapsed,
+        "operations": len(queries),
+        "anon_kb": after["anon_kb"],
+        "file_kb": after["file_kb"],
+        "anon_growth_kb": after["anon_kb"] - before["anon_kb"],
+        "file_growth_kb": after["file_kb"] - before["file_kb"]
+    })
+
+
+def run_readers(snapshot_root, processes, queries, k):
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    start = context.Event()
+    workers = [
+        context.Process(target=_reader, args=(snapshot_root, queries, k, ready, start, results))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get()
+    start.set()
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    wall = max(report["elapsed"] for report in reports)
+    operations = sum(report["operations"] for report in reports)
+    return {
+        "processes": processes,
+        "throughput": operations / wall if wall else 0.0,
+        "anon_kb_per_process": sum(report["anon_kb"] for report in reports) / processes,
+        "file_kb_per_process": sum(report["file_kb"] for report in reports) / processes,
+        "anon_growth_kb_per_process": sum(report["anon_growth_kb"] for report in reports) / processes,
+        "file_growth_kb_per_process": sum(report["file_growth_kb"] for report in reports) / processes
+    }
+
+
+def run(memories=10000, processes=(1, 2, 4), iterations=200, k=5, seed=0):
+    rng = random.Random(seed)
+    queries = [synthetic_text(rng, 8) for _ in range(iterations)]
+    with temporary_workdir() as workdir:
+        snapshot_root = os.path.join(workdir, "snapshots")
+        writer = SnapshotWriterMemory(snapshot_root=snapshot_root, retention_policy=RetentionPolicy(), deduplicate=False)
+        populate(writer, memories, seed)
+        writer.publish_snapshot()
+        index_bytes = os.path.getsize(os.path.join(writer.snapshots.current()[1], "vector_index.faiss"))
+
+        results = {"memories": memories, "index_bytes": index_bytes, "cpu_count": os.cpu_count()}
+        for count in processes:
+            results[f"processes_{count}"] = run_readers(snapshot_root, count, queries, k)
+
+        single = results[f"processes_{processes[0]}"]["throughput"] / processes[0]
+        for count in processes:
+            case = results[f"processes_{count}"]
+            case["scaling"] = case["throughput"] / single if single else 0.0
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memories", type=int, default=10000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=200, help="Searches per process")
+    args = parser.parse_args()
+
+    results = run(args.memories, tuple(args.processes), args.iterations)
+    print(f"memories={results['memories']} index_bytes={results['index_bytes']} cpus={results['cpu_count']}")
+    for count in args.processes:
+        case = results[f"processes_{count}"]
+        print(f"  P={count:<3} throughput={case['throughput']:.1f}/s scaling={case['scaling']:.2f}x "
+              f"anon={case['anon_kb_per_process']:.0f}kB file={case['file_kb_per_process']:.0f}kB "
+              f"(load: +{case['anon_growth_kb_per_process']:.0f}kB anon, +{case['file_growth_kb_per_process']:.0f}kB file)")
+
+
+if __name__ == "__main__":
+    main()
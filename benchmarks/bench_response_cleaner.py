@@ -0,0 +1,105 @@
+"""Micro-benchmark: per-pattern scanning vs combined regex vs Aho-Corasick response cleanup.
+
+Usage:
+    python benchmarks/bench_response_cleaner.py --patterns 500 --length 50000
+"""
+import re
+import time
+import random
+import argparse
+
+from common import REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from config import Config
+from response_cleaner import ResponseCleaner, PatternAutomaton
+
+WORDS = ("the model response check refined version final polite focused identified trying goal next step "
+         "foundational effective answer user question context memory document search result summary").split()
+
+
+def make_patterns(count, rng):
+    """Config patterns plus random 2-4 word phrases"""
+    patterns = list(Config.CLEANUP_PATTERNS)
+    while len(patterns) < count:
+        patterns.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))) + f" {len(patterns)}")
+    return patterns[:count]
+
+
+def make_response(length, patterns, rng):
+    """Random prose with a few pattern occurrences sprinkled in"""
+    parts = []
+    size = 0
+    while size < length:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+        if rng.random() < 0.05:
+            sentence += " " + rng.choice(patterns)
+        parts.append(sentence + (".\n" if rng.random() < 0.2 else ". "))
+        size += len(parts[-1])
+    return "".join(parts)[:length]
+
+
+def naive_clean(text, patterns):
+    """Baseline: drop lines containing a pattern, checking every pattern separately"""
+    return "\n".join(line for line in text.split("\n") if not any(p in line for p in patterns))
+
+
+def regex_clean(text, regex):
+    return "\n".join(line for line in text.split("\n") if not regex.search(line))
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(num_patterns=500, length=50000, chunk_size=16, repeat=5, seed=0):
+    rng = random.Random(seed)
+    patterns = make_patterns(num_patterns, rng)
+    text = make_response(length, patterns, rng)
+
+    cleaner = ResponseCleaner(patterns, mode="line")
+    regex = re.compile("|".join(re.escape(p) for p in sorted(patterns, key=len, reverse=True)))
+
+    def streamed():
+        stream = cleaner.stream()
+        out = [stream.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+        out.append(stream.finish())
+        return "".join(out)
+
+    # All strategies must agree before timing means anything
+    expected = naive_clean(text, patterns)
+    assert cleaner.clean(text) == expected
+    assert regex_clean(text, regex) == expected
+    assert streamed() == expected
+
+    return {
+        "patterns": num_patterns,
+        "text_length": len(text),
+        "chunk_size": chunk_size,
+        "naive_seconds": timed(lambda: naive_clean(text, patterns), repeat),
+        "regex_seconds": timed(lambda: regex_clean(text, regex), repeat),
+        "automaton_seconds": timed(lambda: cleaner.clean(text), repeat),
+        "automaton_streamed_seconds": timed(streamed, repeat),
+        "automaton_compile_seconds": timed(lambda: PatternAutomaton(patterns), repeat)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=500)
+    parser.add_argument("--length", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(args.patterns, args.length, args.chunk_size, args.repeat)
+    for key, value in result.items():
+        print(f"{key:28} {value:.6f}" if isinstance(value, float) else f"{key:28} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Per-tenant shards: opening a cold tenant, warm searches and cross-tenant fan-out.
+
+Usage:
+    python benchmarks/bench_shards.py --tenants 20 --memories 5000
+"""
+import random
+import argparse
+
+from common import measure, temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from bench_vector_memory import populate, synthetic_text
+from memory_shards import ShardManager
+from vector_memory import RetentionPolicy
+
+
+def run(tenants=10, memories=1000, iterations=20, k=5, seed=0):
+    rng = random.Random(seed)
+    queries = [synthetic_text(rng, 8) for _ in range(iterations + 1)]
+    tenant_ids = [f"tenant{i}" for i in range(tenants)]
+
+    with temporary_workdir():
+        manager = ShardManager(max_open=tenants, retention_policy=RetentionPolicy(), deduplicate=False)
+        for i, tenant_id in enumerate(tenant_ids):
+            populate(manager.get(tenant_id), memories, seed + i)
+
+        def cold_open_and_search(i):
+            tenant_id = tenant_ids[i % tenants]
+            manager.unload(tenant_id)
+            manager.get(tenant_id).search_memories(queries[i % len(queries)], k=k)
+
+        def warm_search(i):
+            manager.get(tenant_ids[i % tenants]).search_memories(queries[i % len(queries)], k=k)
+
+        # Warm every shard first so the fan-out measures search, not loading
+        for tenant_id in tenant_ids:
+            manager.get(tenant_id)
+
+        return {
+            "tenants": tenants,
+            "memories_per_tenant": memories,
+            "cold_open_search": measure(cold_open_and_search, iterations),
+            "warm_search": measure(warm_search, iterations),
+            "fan_out_search": measure(lambda i: manager.search_all(queries[i % len(queries)], k=k), iterations)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--memories", type=int, default=1000, help="Memories per tenant")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.tenants, args.memories, args.iterations)
+    print(f"tenants={results['tenants']} memories_per_tenant={results['memories_per_tenant']}")
+    for operation in ("cold_open_search", "warm_search", "fan_out_search"):
+        summary = results[operation]
+        print(f"  {operation:16} p50={summary['p50_ms']:.3f}ms p95={summary['p95_ms']:.3f}ms "
+              f"p99={summary['p99_ms']:.3f}ms throughput={summary['throughput']:.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""VectorMemory add/search/update/delete at increasing store sizes.
+
+Usage:
+    python benchmarks/bench_vector_memory.py --sizes 1000 10000 100000
+"""
+import random
+import argparse
+
+from common import measure, temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+from vector_memory import VectorMemory, RetentionPolicy
+
+VOCABULARY = [f"word{i}" for i in range(2000)]
+TAGS = ["work", "personal", "document", "ocr", "resume", "idea", "todo", "pinned"]
+
+
+def synthetic_text(rng, words=30):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def populate(store, size, seed=0):
+    """Replace the store's contents with size synthetic memories (one rebuild, one save)"""
+    rng = random.Random(seed)
+    timestamp = "2025-01-01T00:00:00"
+    store.memories = [
+        {
+            "id": i + 1,
+            "content": synthetic_text(rng),
+            "tags": rng.sample(TAGS, 2),
+            "source": "benchmark",
+            "created_at": timestamp,
+            "last_accessed": timestamp
+        }
+        for i in range(size)
+    ]
+    store.memory_ids = [mem["id"] for mem in store.memories]
+    # Bulk-load: one rebuild instead of size individual add_memory calls (each of which persists)
+    store._rebuild_index()
+    store._reset_bookkeeping()
+    store.save_memories()
+    store.save_index()
+    return store
+
+
+def build_store(size, seed=0, deduplicate=False):
+    """Create a VectorMemory in the current directory pre-populated with size synthetic memories"""
+    store = VectorMemory(retention_policy=RetentionPolicy(), deduplicate=deduplicate)
+    return populate(store, size, seed)
+
+
+def run(sizes=(1000, 10000), iterations=50, k=5, seed=0):
+    results = {}
+    for size in sizes:
+        # Persisting the whole store on every write dominates at large sizes; keep the run bounded
+        write_iterations = max(3, min(iterations, 200000 // size))
+        rng = random.Random(seed + size)
+        with temporary_workdir():
+            store = build_store(size, seed)
+            queries = [synthetic_text(rng, 8) for _ in range(iterations + 1)]
+
+            case = {"memories": size}
+            case["search"] = measure(lambda i: store.search_memories(queries[i % len(queries)], k=k), iterations)
+            case["add"] = measure(lambda i: store.add_memory(synthetic_text(rng)), write_iterations)
+            ids = [mem["id"] for mem in rng.sample(store.memories, write_iterations * 2 + 2)]
+            case["update_tags"] = measure(lambda i: store.update_memory(ids[i], tags=["updated"]), write_iterations)
+            case["delete"] = measure(lambda i: store.delete_memory(ids[write_iterations + 1 + i]), write_iterations)
+            case["stats"] = measure(lambda i: store.get_memory_stats(), iterations)
+            results[f"size_{size}"] = case
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    for name, case in run(args.sizes, args.iterations).items():
+        print(name)
+        for operation, summary in case.items():
+            if isinstance(summary, dict):
+                print(f"  {operation:12} p50={summary['p50_ms']:.3f}ms p95={summary['p95_ms']:.3f}ms "
+                      f"p99={summary['p99_ms']:.3f}ms throughput={summary['throughput']:.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Shared helpers for the benchmark suites: timing, percentiles and baseline comparison."""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import tempfile
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, math.ceil(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+
+def summarize(samples, elapsed=None):
+    """Latency summary (milliseconds) and throughput for a list of per-operation durations in seconds"""
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(samples)
+    return {
+        "operations": len(samples),
+        "throughput": len(samples) / total if total else 0.0,
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000
+    }
+
+
+def measure(func, iterations, warmup=1):
+    """Call func(i) repeatedly and summarize per-call latency"""
+    for i in range(warmup):
+        func(i)
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - call_started)
+    return summarize(samples, time.perf_counter() - started)
+
+
+@contextmanager
+def temporary_workdir():
+    """Run inside a scratch directory so benchmarks never touch the real data files"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="nexus-bench-") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(previous)
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def write_results(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def load_results(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _is_lower_better(key):
+    # Per-process averages (e.g. anon_kb_per_process) are judged by their unit
+    key = key[:-len("_per_process")] if key.endswith("_per_process") else key
+    return key.endswith(("_ms", "_seconds", "_kb", "_bytes")) or key == "errors"
+
+
+def _is_higher_better(key):
+    return key == "throughput" or key == "recall_at_k"
+
+
+def compare(current, baseline, threshold=0.2):
+    """List metrics that regressed by more than threshold (fractional) versus the baseline.
+
+    Latency (*_ms, *_seconds), memory and size (*_kb, *_bytes) metrics and
+    error counts regress when they grow; throughput and recall_at_k regress when they shrink. Any errors
+    where the baseline had none count as a regression. Cases missing from
+    either side are skipped.
+    """
+    regressions = []
+
+    def walk(current_node, baseline_node, path):
+        for key, value in current_node.items():
+            if key not in baseline_node:
+                continue
+            base = baseline_node[key]
+            if isinstance(value, dict) and isinstance(base, dict):
+                walk(value, base, path + [key])
+            elif isinstance(value, bool) or isinstance(base, bool):
+                continue
+            elif key == "errors" and isinstance(value, (int, float)) and base == 0:
+                if value > 0:
+                    regressions.append({"metric": ".".join(path + [key]), "baseline": base, "current": value, "change": math.inf})
+            elif isinstance(value, (int, float)) and isinstance(base, (int, float)) and base > 0:
+                change = (value - base) / base
+                if _is_lower_better(key) and change > threshold:
+                    regressions.append({"metric": ".".join(path + [key]), "baseline": base, "current": value, "change": change})
+                elif _is_higher_better(key) and -change > threshold:
+                    regressions.append({"metric": ".".join(path + [key]), "baseline": base, "current": value, "change": change})
+
+    walk(current.get("suites", {}), baseline.get("suites", {}), [])
+    return regressions
@@ -0,0 +1,149 @@
+"""In-process HTTP load generator for api_server.app (no network, stubbed model).
+
+Usage:
+    python benchmarks/load_test.py --requests 500 --concurrency 20
+"""
+import sys
+import time
+import types
+import random
+import asyncio
+import argparse
+
+from common import summarize, temporary_workdir, REPO_ROOT  # noqa: F401 (REPO_ROOT puts the repo on sys.path)
+
+import httpx
+
+from config import Config
+from bench_vector_memory import populate, synthetic_text
+
+
+class StubAgent:
+    """Stands in for unified_agent.UnifiedAgent when that module is not available.
+
+    api_server swaps its own VectorMemory in, so the memory calls below hit
+    the same store as the real agent's would.
+    """
+    def __init__(self):
+        from document_processor import DocumentProcessor
+
+        self.vector_memory = None
+        self.document_processor = DocumentProcessor()
+        self.model = "stub"
+        self.user_info = {}
+
+    def process_message(self, message):
+        return f"echo {message}"
+
+    def get_memories(self, tag=None):
+        return self.vector_memory.search_by_tag(tag) if tag else self.vector_memory.get_all_memories()
+
+    def add_memory(self, content, tags=None):
+        return self.vector_memory.add_memory(content, tags)
+
+    def update_memory(self, memory_id, content=None, tags=None):
+        return self.vector_memory.update_memory(memory_id, content, tags)
+
+    def delete_memory(self, memory_id):
+        return self.vector_memory.delete_memory(memory_id)
+
+    def search_memories(self, query):
+        return self.vector_memory.search_memories(query)
+
+
+def ensure_agent_module():
+    """Register StubAgent as unified_agent.UnifiedAgent if the real module cannot be imported"""
+    try:
+        import unified_agent  # noqa: F401
+        return False
+    except ImportError:
+        module = types.ModuleType("unified_agent")
+        module.UnifiedAgent = StubAgent
+        sys.modules["unified_agent"] = module
+        return True
+
+
+async def drive(client, make_request, total, concurrency):
+    """Issue total requests with at most concurrency in flight; returns the latency summary"""
+    samples = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    summary = summarize(samples, time.perf_counter() - started)
+    summary["errors"] = errors
+    return summary
+
+
+async def run_scenarios(app, requests, concurrency, seed):
+    rng = random.Random(seed)
+    queries = [synthetic_text(rng, 6) for _ in range(100)]
+
+    async def chat(client, i):
+        response = await client.post("/api/chat/stream", json={"message": queries[i % len(queries)], "conversation_id": f"c{i % 10}"})
+        return response
+
+    async def search(client, i):
+        return await client.get("/api/memories/search", params={"query": queries[i % len(queries)]})
+
+    async def upload(client, i):
+        files = {"file": (f"note_{i}.txt", synthetic_text(rng, 200).encode("utf-8"), "text/plain")}
+        return await client.post("/api/documents/upload", files=files)
+
+    async def list_page(client, i):
+        return await client.get("/api/memories", params={"limit": 50, "fields": "id,tags"})
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, scenario in (("chat_stream", chat), ("memory_search", search), ("memory_page", list_page), ("upload", upload)):
+            results[name] = await drive(client, scenario, requests, concurrency)
+    return results
+
+
+def run(requests=200, concurrency=10, memories=1000, seed=0):
+    # Stub the model and enable the streaming route before the app is imported
+    Config.USE_FAKE_MODEL = True
+    Config.FAKE_MODEL_DELAY = 0.0
+    Config.ENABLE_STREAMING = True
+    Config.LOG_FILE = ""
+
+    with temporary_workdir():
+        stubbed_agent = ensure_agent_module()
+        import api_server
+
+        store = api_server.vector_memory
+        store.retention_policy.max_items = None
+        populate(store, memories, seed)
+        results = asyncio.run(run_scenarios(api_server.app, requests, concurrency, seed))
+        results["memories"] = memories
+        results["concurrency"] = concurrency
+        results["stubbed_agent"] = stubbed_agent
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--memories", type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, summary in run(args.requests, args.concurrency, args.memories).items():
+        if isinstance(summary, dict):
+            print(f"{name:14} throughput={summary['throughput']:.1f}/s p50={summary['p50_ms']:.2f}ms "
+                  f"p95={summary['p95_ms']:.2f}ms p99={summary['p99_ms']:.2f}ms errors={summary['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Run the benchmark suites, write JSON results and compare them against a stored baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import os
+import sys
+import argparse
+
+from common import environment, write_results, load_results, compare
+
+import bench_vector_memory
+import bench_documents
+import bench_response_cleaner
+import bench_multiworker
+import bench_shards
+import bench_compression
+import bench_llm_client
+import load_test
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name -> (quick settings, full settings)
+SUITES = {
+    "vector_memory": (
+        lambda: bench_vector_memory.run(sizes=(1000, 10000), iterations=30),
+        lambda: bench_vector_memory.run(sizes=(1000, 10000, 100000, 1000000), iterations=50)
+    ),
+    "documents": (
+        lambda: bench_documents.run(pages=(1, 10), iterations=3),
+        lambda: bench_documents.run(pages=(1, 10, 50), iterations=5)
+    ),
+    "response_cleaner": (
+        lambda: bench_response_cleaner.run(num_patterns=200, length=20000, repeat=3),
+        lambda: bench_response_cleaner.run(num_patterns=1000, length=200000, repeat=5)
+    ),
+    "multiworker": (
+        lambda: bench_multiworker.run(memories=10000, processes=(1, 2), iterations=200),
+        lambda: bench_multiworker.run(memories=100000, processes=(1, 2, 4, 8), iterations=1000)
+    ),
+    "shards": (
+        lambda: bench_shards.run(tenants=5, memories=1000, iterations=10),
+        lambda: bench_shards.run(tenants=50, memories=10000, iterations=50)
+    ),
+    "compression": (
+        lambda: bench_compression.run(memories=10000, k=10, queries=50),
+        lambda: bench_compression.run(memories=1000000, k=10, queries=200)
+    ),
+    "llm_client": (
+        lambda: bench_llm_client.run(requests=200, concurrency=20),
+        lambda: bench_llm_client.run(requests=2000, concurrency=100)
+    ),
+    "api_load": (
+        lambda: load_test.run(requests=200, concurrency=10, memories=1000),
+        lambda: load_test.run(requests=2000, concurrency=50, memories=10000)
+    )
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=sorted(SUITES))
+    parser.add_argument("--full", action="store_true", help="Large sizes (up to 1M memories); takes a long time")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed fractional regression (default 0.2)")
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "full": args.full, "suites": {}}
+    for name in args.suites:
+        print(f"Running {name}...", file=sys.stderr)
+        quick, full = SUITES[name]
+        results["suites"][name] = full() if args.full else quick()
+
+    if args.output:
+        write_results(results, args.output)
+    if args.save_baseline:
+        write_results(results, DEFAULT_BASELINE)
+    if not args.output and not args.save_baseline:
+        import json
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']:.4f} -> {regression['current']:.4f} "
+                  f"({regression['change']:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} versus {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 """Configuration module for the Voice and Text Agent."""
+import os
 
 class Config:
     """Central configuration class for the agent."""
@@ -17,6 +18,16 @@ class Config:
     MAX_TOKENS = 500
     TEMPERATURE = 0.7
     
+    # Model Client Configuration
+    LLM_MAX_CONNECTIONS = 20  # Keep-alive connection pool size
+    LLM_KEEPALIVE_EXPIRY = 30  # seconds an idle pooled connection is kept
+    LLM_MAX_CONCURRENCY_PER_MODEL = 8  # Concurrent upstream requests per model
+    LLM_MAX_RETRIES = 3
+    LLM_RETRY_BACKOFF = 0.5  # seconds, doubled on every retry
+    LLM_CACHE_TTL = 0  # seconds to cache identical prompts; 0 disables the cache
+    LLM_CACHE_MAX_ENTRIES = 1000
+    CHAT_USE_MODEL_CLIENT = True  # POST /api/chat uses this client; False falls back to the agent's own model call
+    
     # Speech Recognition Configuration
     SPEECH_RECOGNITION_TIMEOUT = 5  # seconds
     SPEECH_RECOGNITION_PHRASE_TIMEOUT = 3  # seconds
@@ -25,11 +36,70 @@ class Config:
     SYSTEM_PROMPT = "You are a helpful AI assistant. Provide concise, accurate responses."
     MAX_CONVERSATION_HISTORY = 10  # Maximum number of message pairs to keep
     
+    # Context Assembly Configuration (chat)
+    CONTEXT_TOKEN_BUDGET = 3000  # Prompt tokens; the response is capped separately by MAX_TOKENS
+    CONTEXT_MEMORY_K = 3  # Memories retrieved per turn
+    CONTEXT_MEMORY_BUDGET_FRACTION = 0.25  # Share of the budget available to memories
+    CONTEXT_SUMMARY_BUDGET_FRACTION = 0.2  # Share of the remainder available to the summary of older turns
+    CONTEXT_SUMMARY_MAX_TOKENS = 1000  # Cap on the cached per-conversation summary
+    CONTEXT_MAX_CONVERSATIONS = 1000  # Conversations whose history and summary are kept (least recently used dropped)
+    CONTEXT_MAX_HISTORY_MESSAGES = 200  # Messages kept per conversation; older ones survive only in the summary
+    TOKENIZER_ENCODING = "cl100k_base"  # Used when tiktoken is installed
+    
+    # Memory Retention Configuration
+    MAX_MEMORY_ITEMS = 100  # Cap on memories kept in the searchable (hot) index
+    MEMORY_TTL_DAYS = None  # Demote/evict memories older than this; None disables TTL
+    MEMORY_PINNED_TAGS = ["pinned"]  # Memories with any of these tags are never evicted
+    MEMORY_EVICTION_ACTION = "demote"  # Options: demote (move to cold tier), evict (delete)
+    MEMORY_EVICTION_BATCH_SIZE = 50  # Memories processed per retention pass
+    MEMORY_RETENTION_INTERVAL = 60  # seconds between background retention passes
+    
+    # Memory Deduplication Configuration
+    MEMORY_DEDUPLICATE = True  # Skip inserting exact and near-duplicate memories
+    MEMORY_MERGE_DUPLICATE_TAGS = True  # Merge a duplicate's tags into the existing memory
+    MEMORY_NEAR_DUPLICATE_THRESHOLD = 0.85  # Estimated Jaccard similarity (MinHash) to treat as duplicate
+    MEMORY_COLLAPSE_ON_START = True  # Merge duplicates already in the store when the server starts (also POST /api/memories/deduplicate)
+
+    # Memory Index Configuration
+    MEMORY_INDEX_TYPE = "flat"  # Options: flat (exact float32), sq16 (float16 scalar quantization), pq (product quantization)
+    # With pq, update_memory with new content rebuilds the index and so retrains the codebooks; avoid frequent content edits
+    MEMORY_PQ_SUBQUANTIZERS = 10  # PQ code bytes per vector; must divide the vector dimension
+    MEMORY_PQ_BITS = 8  # Bits per PQ subquantizer
+    MEMORY_PQ_MIN_VECTORS = 10000  # Below this the store stays exact; raised to 39 * 2**MEMORY_PQ_BITS if lower (k-means minimum)
+    MEMORY_PQ_TRAINING_SAMPLE = 20000  # Vectors sampled to train the PQ codebooks
+    MEMORY_RERANK = False  # Keep float32 vectors on disk and re-rank compressed search results exactly
+    MEMORY_RERANK_FACTOR = 4  # Candidates fetched from the compressed index per requested result
+    MEMORY_REBUILD_BATCH_SIZE = 10000  # Memories vectorized at a time when rebuilding the index
+    
+    # Memory Listing Configuration
+    MEMORY_PAGE_SIZE = 50  # Default page size for GET /api/memories
+    MEMORY_MAX_PAGE_SIZE = 500  # Upper bound on the requested page size
+
+    # Tenant Shard Configuration (see memory_shards.py)
+    MEMORY_SHARD_DIR = "memory_shards"  # One subdirectory per tenant
+    MEMORY_MAX_OPEN_SHARDS = 32  # Least recently used tenants beyond this are unloaded from RAM
+
+    # Multi-worker Serving Configuration (set by api_server.py --workers, see shared_index.py)
+    SERVER_ROLE = os.environ.get("NEXUS_ROLE", "single")  # Options: single, writer, reader
+    WRITER_URL = os.environ.get("NEXUS_WRITER_URL", "http://127.0.0.1:8001")  # Readers forward memory writes here
+    SNAPSHOT_DIR = os.environ.get("NEXUS_SNAPSHOT_DIR", "memory_snapshots")
+    SNAPSHOT_KEEP_GENERATIONS = 3  # Published generations kept on disk
+    SNAPSHOT_PUBLISH_INTERVAL = 0.2  # seconds; writes within this window share one snapshot
+    SNAPSHOT_POLL_INTERVAL = 0.5  # seconds between reader checks for a new generation
+    SNAPSHOT_WAIT_TIMEOUT = 30  # seconds a reader waits for the first snapshot
+    ACCESS_FLUSH_INTERVAL = 5  # seconds between readers forwarding memory access times to the writer (LRU retention)
+    
     # Logging Configuration
     LOG_LEVEL = "INFO"  # Options: DEBUG, INFO, WARNING, ERROR, CRITICAL
     LOG_FILE = "agent.log"
     ENABLE_RESPONSE_LOGGING = True
     
+    # Instrumentation Configuration
+    ENABLE_METRICS = True  # Timers/counters on hot paths, exposed on /metrics
+    ENABLE_TRACING = False  # Per-request trace spans, logged at DEBUG and returned in X-Trace-Id
+    ENABLE_PROFILER = False  # Allows GET /debug/profile to run the sampling profiler
+    PROFILER_INTERVAL = 0.005  # seconds between profiler samples
+    
     # UI Configuration
     CONSOLE_WIDTH = 80
     AGENT_NAME = "AI Assistant"
@@ -43,8 +113,14 @@ class Config:
         "I've begun", "I've moved", "I've discarded", "I've experimented",
         "I'm now attempting", "My goal is", "My next step", "This foundational"
     ]
+    CLEANUP_MODE = "line"  # Options: line (drop lines containing a pattern), phrase (remove only the match)
+    STREAM_CLEANUP_MODE = "phrase"  # Streamed chat; line mode would hold back every token until the line ends
     
     # Feature Flags
     ENABLE_VOICE = True
     ENABLE_TEXT = True
-    ENABLE_STREAMING = False  # Future feature for streaming responses
+    ENABLE_STREAMING = False  # Enables /api/chat/stream (SSE) and /ws/chat (WebSocket)
+    
+    # Local fake model for tests and offline development
+    USE_FAKE_MODEL = False
+    FAKE_MODEL_DELAY = 0.0  # seconds between streamed words
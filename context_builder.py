@@ -0,0 +1,235 @@
+"""Token-budgeted prompt assembly for the chat pipeline."""
+import re
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from config import Config
+
+try:
+    import tiktoken
+except ImportError:  # Optional; fall back to an approximate counter
+    tiktoken = None
+
+# Per-message overhead of the chat format (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer once per process"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(Config.TOKENIZER_ENCODING)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text):
+    """Count tokens in text (exact with tiktoken, approximate otherwise)"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # Roughly one token per word piece or punctuation mark, long words split every 4 chars
+    return sum(max(1, len(piece) // 4) for piece in re.findall(r"\w+|[^\w\s]", text))
+
+
+def count_message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Trim text so it fits within max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:max_tokens])
+    # Binary search on a character prefix for the approximate counter
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def tail_lines_to_tokens(text, max_tokens):
+    """Keep the most recent lines of text that fit within max_tokens"""
+    kept = []
+    used = 0
+    for line in reversed(text.split("\n")):
+        used += count_tokens(line) + 1
+        if used > max_tokens:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+def extractive_summary(messages, previous_summary=""):
+    """Default summarizer: first sentence of every message, appended to the running summary"""
+    lines = [previous_summary] if previous_summary else []
+    for message in messages:
+        first_sentence = re.split(r"(?<=[.!?])\s", message["content"].strip(), maxsplit=1)[0]
+        lines.append(f"{message['role']}: {first_sentence[:200]}")
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """Packs system prompt, memories, summarized and recent turns into a token budget.
+
+    Older turns are folded into a per-conversation summary exactly once: the
+    summary cache remembers how many messages it already covers, so each turn
+    only summarizes messages that newly fell out of the recent window.
+
+    Each conversation keeps its own bounded history (record_turn); only the
+    max_conversations most recently used conversations are kept.
+    """
+    def __init__(self, vector_memory=None, token_budget=None, memory_k=None, memory_budget_fraction=None,
+                 summary_budget_fraction=None, summarizer=None, system_prompt=None, max_conversations=None,
+                 max_history_messages=None):
+        self.vector_memory = vector_memory
+        self.token_budget = token_budget or Config.CONTEXT_TOKEN_BUDGET
+        self.memory_k = Config.CONTEXT_MEMORY_K if memory_k is None else memory_k
+        self.memory_budget_fraction = Config.CONTEXT_MEMORY_BUDGET_FRACTION if memory_budget_fraction is None else memory_budget_fraction
+        self.summary_budget_fraction = Config.CONTEXT_SUMMARY_BUDGET_FRACTION if summary_budget_fraction is None else summary_budget_fraction
+        self.summarizer = summarizer or extractive_summary
+        self.system_prompt = system_prompt or Config.SYSTEM_PROMPT
+        self.max_conversations = max_conversations or Config.CONTEXT_MAX_CONVERSATIONS
+        self.max_history_messages = max_history_messages or Config.CONTEXT_MAX_HISTORY_MESSAGES
+
+        # Keyed by client-supplied IDs, so both are LRU-bounded to max_conversations
+        # conversation_id -> (number of history messages summarized, summary text)
+        self._summaries = OrderedDict()
+        # conversation_id -> list of {"role", "content"} messages
+        self._histories = OrderedDict()
+        self._lock = threading.RLock()
+
+    def reset(self, conversation_id):
+        """Forget a conversation's history and cached summary"""
+        with self._lock:
+            self._summaries.pop(conversation_id, None)
+            self._histories.pop(conversation_id, None)
+
+    def history(self, conversation_id):
+        """Copy of the stored history for a conversation"""
+        with self._lock:
+            return list(self._histories.get(conversation_id, []))
+
+    def record_turn(self, conversation_id, message, response):
+        """Append a user/assistant exchange to the conversation's history"""
+        with self._lock:
+            history = self._histories.setdefault(conversation_id, [])
+            history.append({"role": "user", "content": message})
+            history.append({"role": "assistant", "content": response})
+            self._histories.move_to_end(conversation_id)
+
+            # Fold the oldest messages into the summary before dropping them, then shift its count
+            excess = len(history) - self.max_history_messages
+            if excess > 0:
+                summarized, summary = self._summaries.get(conversation_id, (0, ""))
+                if excess > summarized:
+                    summarized, summary = self._summarize(conversation_id, history, excess)
+                del history[:excess]
+                self._summaries[conversation_id] = (summarized - excess, summary)
+            self._evict()
+
+    def _evict(self):
+        while len(self._histories) > self.max_conversations:
+            conversation_id, _ = self._histories.popitem(last=False)
+            self._summaries.pop(conversation_id, None)
+        while len(self._summaries) > self.max_conversations:
+            self._summaries.popitem(last=False)
+
+    def _summarize(self, conversation_id, history, upto):
+        """Extend the cached summary so it covers history[:upto]"""
+        summarized, summary = self._summaries.get(conversation_id, (0, ""))
+        if summarized > len(history):
+            # History was cleared or replaced; start over
+            summarized, summary = 0, ""
+        if upto > summarized:
+            summary = self.summarizer(history[summarized:upto], summary)
+            # Bound the cached summary; the oldest lines go first
+            summary = tail_lines_to_tokens(summary, Config.CONTEXT_SUMMARY_MAX_TOKENS)
+            summarized = upto
+        self._summaries[conversation_id] = (summarized, summary)
+        self._summaries.move_to_end(conversation_id)
+        self._evict()
+        return summarized, summary
+
+    def _memory_block(self, message, budget):
+        if self.vector_memory is None or self.memory_k <= 0 or budget <= 0:
+            return "", 0
+        results = self.vector_memory.search_memories(message, k=self.memory_k)
+
+        lines = []
+        used = count_tokens("Relevant memories:\n")
+        for memory in results:
+            remaining = budget - used
+            if remaining <= MESSAGE_OVERHEAD_TOKENS:
+                break
+            line = "- " + truncate_to_tokens(memory["content"], remaining - MESSAGE_OVERHEAD_TOKENS)
+            lines.append(line)
+            used += count_tokens(line) + 1
+        if not lines:
+            return "", 0
+        return "Relevant memories:\n" + "\n".join(lines), len(lines)
+
+    def build(self, message, history=None, conversation_id="default"):
+        """Return (messages, report) for the next model call; history defaults to the stored one"""
+        started = time.perf_counter()
+
+        system_message = {"role": "system", "content": self.system_prompt}
+        user_message = {"role": "user", "content": message}
+        remaining = self.token_budget - count_message_tokens(system_message) - count_message_tokens(user_message)
+
+        # Retrieved memories get a fixed share of whatever is left
+        memory_text, memory_count = self._memory_block(message, int(remaining * self.memory_budget_fraction))
+        if memory_text:
+            remaining -= count_tokens(memory_text) + MESSAGE_OVERHEAD_TOKENS
+        summary_budget = int(remaining * self.summary_budget_fraction)
+
+        with self._lock:
+            if history is None:
+                history = self.history(conversation_id)
+
+            # Recent turns newest-first until the budget (minus the summary share) runs out;
+            # messages already folded into the summary are never sent verbatim again
+            summarized, _ = self._summaries.get(conversation_id, (0, ""))
+            summarized = min(summarized, len(history))
+            recent_budget = remaining - summary_budget
+            start = len(history)
+            while start > summarized:
+                cost = count_message_tokens(history[start - 1])
+                if cost > recent_budget:
+                    break
+                recent_budget -= cost
+                start -= 1
+
+            summarized, summary = self._summarize(conversation_id, history, start)
+            summary_text = tail_lines_to_tokens(summary, summary_budget - MESSAGE_OVERHEAD_TOKENS) if summary else ""
+
+            messages = [system_message]
+            if memory_text:
+                messages.append({"role": "system", "content": memory_text})
+            if summary_text:
+                messages.append({"role": "system", "content": "Summary of earlier conversation:\n" + summary_text})
+            messages.extend(history[start:])
+            messages.append(user_message)
+
+            report = {
+                "prompt_tokens": sum(count_message_tokens(m) for m in messages),
+                "token_budget": self.token_budget,
+                "recent_messages": len(history) - start,
+                "summarized_messages": summarized,
+                "memories": memory_count,
+                "assembly_ms": (time.perf_counter() - started) * 1000
+            }
+            return messages, report
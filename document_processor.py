@@ -5,6 +5,15 @@ import pytesseract
 from PIL import Image
 import re
 
+from logging_config import get_logger
+from metrics import registry, timed
+
+logger = get_logger(__name__)
+
+# The extractors return an error string instead of raising, so @timed never sees these failures
+extract_pdf_errors = registry.counter("document_extract_pdf_errors_total", "Errors raised by document_extract_pdf")
+ocr_errors = registry.counter("document_ocr_errors_total", "Errors raised by document_ocr")
+
 class DocumentProcessor:
     def __init__(self, tesseract_path=None):
         # Set Tesseract path if provided
@@ -22,6 +31,7 @@ class DocumentProcessor:
         if not os.path.exists(self.docs_dir):
             os.makedirs(self.docs_dir)
     
+    @timed("document_extract_pdf")
     def extract_text_from_pdf(self, pdf_path):
         """Extract text from a PDF file using multiple methods for better results"""
         try:
@@ -34,8 +44,11 @@ class DocumentProcessor:
                 
             return text
         except Exception as e:
+            logger.error("Error extracting text from PDF", exc_info=True, extra={"path": pdf_path})
+            extract_pdf_errors.inc()
             return f"Error extracting text from PDF: {str(e)}"
     
+    @timed("document_extract_pypdf2")
     def _extract_with_pypdf2(self, pdf_path):
         """Extract text using PyPDF2 as a backup method"""
         text = ""
@@ -46,6 +59,7 @@ class DocumentProcessor:
                 text += page.extract_text() + "\n"
         return text
     
+    @timed("document_ocr")
     def perform_ocr(self, image_path, language='eng'):
         """Extract text from an image using OCR"""
         try:
@@ -65,7 +79,7 @@ class DocumentProcessor:
                     for ext in [".png", ".jpg", ".jpeg", ".bmp"]:
                         test_path = image_path + ext
                         if os.path.exists(test_path):
-                            print(f"Found matching screenshot file: {test_path}")
+                            logger.info("Found matching screenshot file", extra={"path": test_path})
                             image_path = test_path
                             break
             
@@ -94,6 +108,8 @@ class DocumentProcessor:
             text = pytesseract.image_to_string(image, lang=language)
             return text
         except Exception as e:
+            logger.error("Error performing OCR", exc_info=True, extra={"path": image_path})
+            ocr_errors.inc()
             return f"Error performing OCR: {str(e)}"
     
     def extract_resume_info(self, text):
@@ -138,6 +154,7 @@ class DocumentProcessor:
         
         return info
     
+    @timed("document_save")
     def save_document(self, file_path, document_type='other'):
         """Save a document to the documents directory and extract its text"""
         try:
@@ -160,7 +177,7 @@ class DocumentProcessor:
                     for ext in [".pdf", ".docx", ".doc", ".txt"]:
                         test_path = base_path + ext
                         if os.path.exists(test_path):
-                            print(f"Found matching document file: {test_path}")
+                            logger.info("Found matching document file", extra={"path": test_path})
                             file_path = test_path
                             break
             
@@ -224,4 +241,5 @@ class DocumentProcessor:
             
             return result
         except Exception as e:
+            logger.error("Error saving document", exc_info=True, extra={"path": file_path})
             return {"error": str(e)}
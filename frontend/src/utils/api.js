@@ -26,10 +26,26 @@ if (storedApiKey) {
   setApiKey(storedApiKey);
 }
 
+// Each browser tab keeps its own conversation so the server never mixes histories
+export const getConversationId = () => {
+  let conversationId = sessionStorage.getItem('conversationId');
+  if (!conversationId) {
+    conversationId = crypto.randomUUID();
+    sessionStorage.setItem('conversationId', conversationId);
+  }
+  return conversationId;
+};
+
+// Start a fresh conversation (the server forgets nothing; the old one simply stops being used)
+export const newConversation = () => {
+  sessionStorage.removeItem('conversationId');
+  return getConversationId();
+};
+
 // API functions for chat
 export const sendMessage = async (message) => {
   try {
-    const response = await api.post('/chat', { message });
+    const response = await api.post('/chat', { message, conversation_id: getConversationId() });
     return response.data;
   } catch (error) {
     console.error('Error sending message:', error);
@@ -37,6 +53,56 @@ export const sendMessage = async (message) => {
   }
 };
 
+// Stream a chat response over Server-Sent Events (requires ENABLE_STREAMING on the server).
+// onToken is called for every token; abort the signal to cancel generation.
+export const streamMessage = async (message, onToken, signal) => {
+  const headers = { 'Content-Type': 'application/json' };
+  const apiKey = localStorage.getItem('apiKey');
+  if (apiKey) {
+    headers['Authorization'] = `Bearer ${apiKey}`;
+  }
+
+  const response = await fetch('/api/chat/stream', {
+    method: 'POST',
+    headers,
+    body: JSON.stringify({ message, conversation_id: getConversationId() }),
+    signal,
+  });
+  if (!response.ok) {
+    throw new Error(`Streaming request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const event of events) {
+      const eventType = (event.match(/^event: (.*)$/m) || [])[1];
+      const data = (event.match(/^data: (.*)$/m) || [])[1];
+      if (!data) continue;
+      const payload = JSON.parse(data);
+      if (eventType === 'error') {
+        throw new Error(payload.detail);
+      }
+      if (eventType === 'done') {
+        return payload.response;
+      }
+      result += payload.token;
+      onToken(payload.token);
+    }
+  }
+  return result;
+};
+
 // API functions for documents
 export const uploadDocument = async (file) => {
   const formData = new FormData();
@@ -0,0 +1,301 @@
+"""Model clients used by the API server for chat completions."""
+import json
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+import httpx
+
+from config import Config
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class ResponseCache:
+    """TTL cache of (model, messages, temperature, max_tokens) -> completion"""
+    def __init__(self, ttl=300, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class OpenRouterClient:
+    """Async client for the OpenRouter chat completions API.
+
+    Requests share one keep-alive connection pool, are limited per model,
+    retried with exponential backoff, and identical in-flight completions are
+    coalesced into a single upstream call. Point api_url at a local stub
+    server, or pass an httpx transport (e.g. httpx.MockTransport), to test
+    without the real API.
+    """
+    def __init__(self, api_key=None, api_url=None, timeout=60.0, max_connections=None, max_concurrency_per_model=None,
+                 max_retries=None, backoff=None, cache_ttl=None, transport=None):
+        self.api_key = api_key or Config.OPENROUTER_API_KEY
+        self.api_url = api_url or Config.OPENROUTER_API_URL
+        self.timeout = timeout
+        self.max_connections = max_connections or Config.LLM_MAX_CONNECTIONS
+        self.max_concurrency_per_model = max_concurrency_per_model or Config.LLM_MAX_CONCURRENCY_PER_MODEL
+        self.max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = Config.LLM_RETRY_BACKOFF if backoff is None else backoff
+        cache_ttl = Config.LLM_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache = ResponseCache(ttl=cache_ttl, max_entries=Config.LLM_CACHE_MAX_ENTRIES) if cache_ttl else None
+
+        self.transport = transport
+        self._client = None
+        self._semaphores = {}
+        self._in_flight = {}
+        self._active_requests = 0
+        self._peak_active_requests = 0
+        self._requests = 0
+        self._retries = 0
+        self._coalesced = 0
+
+    def _get_client(self):
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=Config.LLM_KEEPALIVE_EXPIRY
+            )
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits, headers=self._headers(), transport=self.transport)
+        return self._client
+
+    async def aclose(self):
+        """Cancel abandoned in-flight completions and close the connection pool"""
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _payload(self, messages, model=None, max_tokens=None, temperature=None, stream=False):
+        return {
+            "model": model or Config.DEFAULT_MODEL,
+            "messages": messages,
+            "max_tokens": max_tokens or Config.MAX_TOKENS,
+            "temperature": Config.TEMPERATURE if temperature is None else temperature,
+            "stream": stream
+        }
+
+    @staticmethod
+    def _cache_key(payload):
+        return json.dumps([payload["model"], payload["messages"], payload["temperature"], payload["max_tokens"]], sort_keys=True)
+
+    def _semaphore(self, model):
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        return self._semaphores[model]
+
+    def _track(self, delta):
+        self._active_requests += delta
+        self._peak_active_requests = max(self._peak_active_requests, self._active_requests)
+
+    async def _backoff_sleep(self, attempt):
+        self._retries += 1
+        await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    def _should_retry(self, error, attempt):
+        if attempt >= self.max_retries:
+            return False
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(error, (httpx.TransportError, httpx.TimeoutException))
+
+    async def _post(self, payload):
+        """Send a non-streaming request with retries and return the completion text"""
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore(payload["model"]):
+                    self._track(1)
+                    self._requests += 1
+                    try:
+                        response = await self._get_client().post(self.api_url, json=payload)
+                        response.raise_for_status()
+                    finally:
+                        self._track(-1)
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await self._backoff_sleep(attempt)
+                attempt += 1
+
+    async def complete(self, messages, model=None, max_tokens=None, temperature=None):
+        """Return the full completion for messages"""
+        payload = self._payload(messages, model, max_tokens, temperature)
+        key = self._cache_key(payload)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        # Identical prompts already in flight share the same upstream call
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(key, payload))
+            self._in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finish_in_flight, key))
+
+        # Shielded so a caller that goes away (client disconnect) does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, payload):
+        result = await self._post(payload)
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _finish_in_flight(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception so a call every caller abandoned does not log "never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def stream_chat(self, messages, model=None, max_tokens=None, temperature=None):
+        """Yield response tokens as the model produces them"""
+        payload = self._payload(messages, model, max_tokens, temperature, stream=True)
+        key = self._cache_key(payload)
+
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        tokens = []
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore(payload["model"]):
+                    self._track(1)
+                    self._requests += 1
+                    try:
+                        async with self._get_client().stream("POST", self.api_url, json=payload) as response:
+                            response.raise_for_status()
+                            # OpenAI-compatible SSE: "data: {...}" lines terminated by "data: [DONE]"
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                chunk = json.loads(data)
+                                choices = chunk.get("choices") or [{}]
+                                token = choices[0].get("delta", {}).get("content")
+                                if token:
+                                    tokens.append(token)
+                                    yield token
+                    finally:
+                        self._track(-1)
+                break
+            except Exception as e:
+                # Once tokens have been forwarded a retry would duplicate output
+                if tokens or not self._should_retry(e, attempt):
+                    raise
+                await self._backoff_sleep(attempt)
+                attempt += 1
+
+        if self.cache is not None:
+            self.cache.set(key, "".join(tokens))
+
+    def stats(self):
+        """Connection pool, concurrency and cache statistics"""
+        return {
+            "pool": {
+                "max_connections": self.max_connections,
+                "active_requests": self._active_requests,
+                "peak_active_requests": self._peak_active_requests,
+                "utilisation": self._active_requests / self.max_connections
+            },
+            "requests": self._requests,
+            "retries": self._retries,
+            "coalesced": self._coalesced,
+            "in_flight_prompts": len(self._in_flight),
+            "cache": self.cache.stats() if self.cache is not None else None
+        }
+
+
+class FakeStreamingClient:
+    """Local stand-in for the model that streams a canned reply word by word (tests and offline use)"""
+    def __init__(self, reply=None, delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self._requests = 0
+
+    def _reply_for(self, messages):
+        if self.reply is not None:
+            return self.reply
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return f"You said: {last_user}"
+
+    async def complete(self, messages, model=None, max_tokens=None, temperature=None):
+        """Return the canned reply (or an echo of the last user message)"""
+        self._requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._reply_for(messages)
+
+    async def stream_chat(self, messages, model=None, max_tokens=None, temperature=None):
+        """Yield the canned reply (or an echo of the last user message) one word at a time"""
+        self._requests += 1
+        words = self._reply_for(messages).split(" ")
+        for i, word in enumerate(words):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield word if i == len(words) - 1 else word + " "
+
+    async def aclose(self):
+        pass
+
+    def stats(self):
+        return {"requests": self._requests, "fake": True}
+
+
+def create_chat_client():
+    """Build the model client selected in Config"""
+    if Config.USE_FAKE_MODEL:
+        return FakeStreamingClient(delay=Config.FAKE_MODEL_DELAY)
+    return OpenRouterClient()
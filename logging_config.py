@@ -0,0 +1,53 @@
+"""Structured (JSON lines) logging driven by Config.LOG_LEVEL and Config.LOG_FILE."""
+import json
+import logging
+from datetime import datetime, timezone
+
+from config import Config
+
+# Attributes every LogRecord has; anything else was passed via extra= and is logged as a field
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any extra= fields"""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_configured = False
+
+
+def configure_logging(level=None, log_file=None):
+    """Attach JSON handlers to the root logger (console, plus LOG_FILE when set)"""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler()]
+    log_file = Config.LOG_FILE if log_file is None else log_file
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+
+    root = logging.getLogger()
+    root.setLevel(level or Config.LOG_LEVEL)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
@@ -0,0 +1,105 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+
+# Mersenne prime used for the universal hash family
+_PRIME = (1 << 31) - 1
+
+
+def content_hash(text):
+    """Hash of the normalized text, used for exact duplicate detection"""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class MinHashLSH:
+    """Incremental MinHash / LSH index for near-duplicate text detection.
+
+    Signatures are split into bands; two texts become candidates when any band
+    matches exactly, so a lookup only touches the buckets it hashes to instead
+    of comparing against the whole corpus.
+    """
+    def __init__(self, num_perm=64, bands=16, threshold=0.85, shingle_size=3, seed=1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+
+        self._buckets = {}
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+    def _shingles(self, text):
+        words = re.findall(r"\w+", text.lower())
+        # Shorter texts have no shingle; left to exact matching, they would all share one signature
+        if len(words) < self.shingle_size:
+            return set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        """Compute the MinHash signature of a text, or None if it is too short to have one"""
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64
+        )
+        # (a * h + b) mod p for every permutation/shingle pair, then min per permutation
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key, signature):
+        """Add a signature under key (a None signature is never matched)"""
+        if key in self._signatures:
+            self.remove(key)
+        if signature is None:
+            return
+        self._signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        """Remove a previously inserted key"""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def query(self, signature):
+        """Return (key, estimated_jaccard) for candidates at or above the threshold, best first"""
+        if signature is None:
+            return []
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda x: x[1], reverse=True)
+        return matches
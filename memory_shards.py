@@ -0,0 +1,140 @@
+"""Per-tenant memory stores.
+
+Each tenant gets its own VectorMemory (memories, FAISS index, vectorizer and
+cold tier) under MEMORY_SHARD_DIR/<tenant>/. Shards are loaded on first use
+and the least recently used ones are dropped from RAM once more than
+MEMORY_MAX_OPEN_SHARDS are open; every write is already persisted, so
+unloading needs no flush.
+"""
+import os
+import re
+import heapq
+import threading
+import weakref
+from collections import OrderedDict
+
+from config import Config
+from vector_memory import VectorMemory
+from logging_config import get_logger
+from metrics import timed
+
+logger = get_logger(__name__)
+
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def validate_tenant_id(tenant_id):
+    """Tenant IDs become directory names, so only allow a safe subset"""
+    if not isinstance(tenant_id, str) or not TENANT_PATTERN.match(tenant_id):
+        raise ValueError(f"Invalid tenant ID: {tenant_id!r}")
+    return tenant_id
+
+
+class ShardManager:
+    """Opens tenant stores on demand and keeps an LRU of the open ones"""
+    def __init__(self, root=None, max_open=None, **store_kwargs):
+        self.root = root or Config.MEMORY_SHARD_DIR
+        self.max_open = max_open or Config.MEMORY_MAX_OPEN_SHARDS
+        self.store_kwargs = store_kwargs
+        self._open = OrderedDict()
+        # Evicted shards still referenced by an in-flight request are reused, never opened twice
+        self._live = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self._tenant_locks = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def shard_dir(self, tenant_id):
+        return os.path.join(self.root, validate_tenant_id(tenant_id))
+
+    def exists(self, tenant_id):
+        return os.path.isdir(self.shard_dir(tenant_id))
+
+    def tenants(self):
+        """All tenants with a shard on disk"""
+        return sorted(name for name in os.listdir(self.root)
+                      if TENANT_PATTERN.match(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def open_tenants(self):
+        """Tenants currently loaded, least recently used first"""
+        with self._lock:
+            return list(self._open)
+
+    def get(self, tenant_id, create=True):
+        """Return the tenant's store, loading it if needed.
+
+        With create=False a tenant without a shard on disk raises KeyError
+        instead of getting an empty one.
+        """
+        validate_tenant_id(tenant_id)
+        with self._lock:
+            store = self._open.get(tenant_id)
+            if store is not None:
+                self._open.move_to_end(tenant_id)
+                return store
+            # Only real (or about to be created) tenants get a lock, so unknown IDs cannot grow this dict
+            if not create and tenant_id not in self._tenant_locks and not self.exists(tenant_id):
+                raise KeyError(f"Unknown tenant: {tenant_id}")
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+
+        # Load outside the manager lock so a slow shard does not block other tenants
+        with tenant_lock:
+            with self._lock:
+                store = self._open.get(tenant_id) or self._live.get(tenant_id)
+            if store is None:
+                if not create and not self.exists(tenant_id):
+                    raise KeyError(f"Unknown tenant: {tenant_id}")
+                store = self._load(tenant_id)
+            with self._lock:
+                self._open[tenant_id] = store
+                self._open.move_to_end(tenant_id)
+                self._live[tenant_id] = store
+                self._evict()
+            return store
+
+    @timed("memory_shard_load")
+    def _load(self, tenant_id):
+        directory = self.shard_dir(tenant_id)
+        os.makedirs(directory, exist_ok=True)
+        store = VectorMemory(
+            memory_file=os.path.join(directory, "vector_memories.json"),
+            index_file=os.path.join(directory, "vector_index.faiss"),
+            vectorizer_file=os.path.join(directory, "vectorizer.pkl"),
+            cold_memory_file=os.path.join(directory, "cold_memories.json"),
+            embedding_file=os.path.join(directory, "vector_embeddings.f32"),
+            **self.store_kwargs
+        )
+        logger.debug("Opened memory shard", extra={"tenant": tenant_id, "size": store.index.ntotal})
+        return store
+
+    def _evict(self):
+        # Called with self._lock held
+        while len(self._open) > self.max_open:
+            tenant_id, _ = self._open.popitem(last=False)
+            logger.debug("Unloaded memory shard", extra={"tenant": tenant_id})
+
+    def unload(self, tenant_id):
+        """Drop a tenant's store from RAM (its files stay on disk)"""
+        with self._lock:
+            return self._open.pop(tenant_id, None) is not None
+
+    @timed("memory_shard_search_all")
+    def search_all(self, query, k=5, tenant_ids=None, include_cold=False):
+        """Search several tenants and merge their top-k results by relevance score"""
+        tenant_ids = self.tenants() if tenant_ids is None else [validate_tenant_id(t) for t in tenant_ids]
+        results = []
+        for tenant_id in tenant_ids:
+            if not self.exists(tenant_id):
+                continue
+            for memory in self.get(tenant_id, create=False).search_memories(query, k=k, include_cold=include_cold):
+                memory["tenant"] = tenant_id
+                results.append(memory)
+        return heapq.nlargest(k, results, key=lambda memory: memory["relevance_score"])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "total_tenants": len(self.tenants()),
+                "open_shards": len(self._open),
+                "max_open_shards": self.max_open,
+                "open_memories": sum(store.index.ntotal for store in self._open.values())
+            }
@@ -0,0 +1,276 @@
+"""Lightweight metrics, trace spans and sampling profiler.
+
+Everything here is a no-op apart from one flag check when Config.ENABLE_METRICS
+(and Config.ENABLE_TRACING for spans) is off, so instrumented hot paths cost
+next to nothing in that case.
+"""
+import sys
+import time
+import uuid
+import threading
+import functools
+import contextvars
+from collections import Counter as _Counter
+from contextlib import contextmanager
+
+from config import Config
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+    type_name = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labels), 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled"""
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            bucket_counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+                    break
+            state[1] += 1
+            state[2] += value
+
+    def count(self, **labels):
+        state = self._values.get(tuple(labels.get(name, "") for name in self.labels))
+        return state[1] if state else 0
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (bucket_counts, count, total) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def render(self):
+        try:
+            return [f"{self.name} {float(self.callback())}"]
+        except Exception:
+            return []
+
+
+class MetricsRegistry:
+    """Holds all metrics and renders them in Prometheus text format"""
+    def __init__(self, enabled=None):
+        self.enabled = Config.ENABLE_METRICS if enabled is None else enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback):
+        """Register (or replace) a callback gauge"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, callback)
+            return self._metrics[name]
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            samples = metric.render()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# Tracing: spans are collected into the trace of the current request (if any)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.spans = []
+        self._started = time.perf_counter()
+        self._stack = []
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": (time.perf_counter() - self._started) * 1000,
+            "spans": self.spans
+        }
+
+
+@contextmanager
+def start_trace(name):
+    """Collect spans for the enclosed work when tracing is enabled"""
+    if not Config.ENABLE_TRACING:
+        yield None
+        return
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Record a timed span in the current trace (no-op outside a trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    parent = trace._stack[-1] if trace._stack else None
+    trace._stack.append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace._stack.pop()
+        trace.spans.append({
+            "name": name,
+            "parent": parent,
+            "start_ms": (started - trace._started) * 1000,
+            "duration_ms": (time.perf_counter() - started) * 1000
+        })
+
+
+def timed(name, help_text=""):
+    """Decorator recording call latency, errors and a trace span under name"""
+    def decorator(func):
+        histogram = registry.histogram(f"{name}_seconds", help_text or f"Latency of {name}")
+        errors = registry.counter(f"{name}_errors_total", f"Errors raised by {name}")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                with span(name):
+                    return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class SamplingProfiler:
+    """Opt-in wall-clock sampling profiler that aggregates stacks of all threads.
+
+    Output is in collapsed-stack format ("frame;frame;frame count"), which
+    flamegraph tools accept directly.
+    """
+    def __init__(self, interval=None):
+        self.interval = interval or Config.PROFILER_INTERVAL
+        self._samples = _Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self._samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        return "\n".join(f"{stack} {count}" for stack, count in self._samples.most_common())
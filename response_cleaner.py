@@ -0,0 +1,202 @@
+"""Single-pass removal of Config.CLEANUP_PATTERNS from model responses."""
+from collections import deque
+
+from config import Config
+
+
+class PatternAutomaton:
+    """Aho-Corasick automaton over a fixed set of phrases.
+
+    Every pattern is matched in a single left-to-right pass, so cost is
+    proportional to the text length rather than patterns x text length.
+    """
+    def __init__(self, patterns, ignore_case=False):
+        self.ignore_case = ignore_case
+        self.patterns = [p.lower() if ignore_case else p for p in patterns if p]
+        self.max_length = max((len(p) for p in self.patterns), default=0)
+
+        # State 0 is the root; goto[state] maps a character to the next state
+        self._goto = [{}]
+        self._fail = [0]
+        # Length of the longest pattern ending at each state (0 when none)
+        self._match = [0]
+
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._match.append(0)
+                state = next_state
+            self._match[state] = max(self._match[state], len(pattern))
+
+        # Breadth-first failure links; a state inherits matches from its failure state
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._match[next_state] = max(self._match[next_state], self._match[self._fail[next_state]])
+
+    def step(self, state, char):
+        """Advance one character; returns (new_state, length of longest match ending here)"""
+        if self.ignore_case:
+            char = char.lower()
+        while state and char not in self._goto[state]:
+            state = self._fail[state]
+        state = self._goto[state].get(char, 0)
+        return state, self._match[state]
+
+    def find_spans(self, text):
+        """Return merged (start, end) spans covered by any pattern occurrence"""
+        spans = []
+        state = 0
+        for end, char in enumerate(text, 1):
+            state, length = self.step(state, char)
+            if length:
+                _add_span(spans, end - length, end)
+        return spans
+
+
+def _add_span(spans, start, end):
+    """Append a span, merging it with the previous one when they overlap"""
+    if spans and start <= spans[-1][1]:
+        spans[-1] = (min(spans[-1][0], start), max(spans[-1][1], end))
+    else:
+        spans.append((start, end))
+
+
+class ResponseCleaner:
+    """Removes cleanup patterns from responses, recompiling when the pattern list changes.
+
+    mode="line" drops every line that contains a pattern (the patterns are
+    mostly reasoning-trace phrases); mode="phrase" removes only the matched text.
+    """
+    def __init__(self, patterns=None, mode=None, ignore_case=False):
+        if mode is None:
+            mode = Config.CLEANUP_MODE
+        if mode not in ("line", "phrase"):
+            raise ValueError(f"Unknown cleanup mode: {mode}")
+        self._patterns = patterns
+        self.mode = mode
+        self.ignore_case = ignore_case
+        self._compiled_key = None
+        self._automaton = None
+
+    @property
+    def automaton(self):
+        # Patterns default to the live Config list so edits to it take effect
+        patterns = Config.CLEANUP_PATTERNS if self._patterns is None else self._patterns
+        key = tuple(patterns)
+        if key != self._compiled_key:
+            self._automaton = PatternAutomaton(key, self.ignore_case)
+            self._compiled_key = key
+        return self._automaton
+
+    def set_patterns(self, patterns):
+        """Replace the pattern list; compiled on next use"""
+        self._patterns = list(patterns)
+
+    def clean(self, text):
+        """Clean a complete response"""
+        stream = self.stream()
+        return stream.feed(text) + stream.finish()
+
+    def stream(self, mode=None):
+        """Return an incremental cleaner for one streamed response (mode overrides self.mode)"""
+        if (mode or self.mode) == "line":
+            return _LineStreamCleaner(self.automaton)
+        return _PhraseStreamCleaner(self.automaton)
+
+
+class _LineStreamCleaner:
+    """Holds back the current line until it is known to be clean.
+
+    Kept lines are joined with newlines, so a separator is only emitted once
+    the line after it is known to survive (same result as filtering split lines).
+    """
+    def __init__(self, automaton):
+        self._automaton = automaton
+        self._state = 0
+        self._line = []
+        self._dirty = False
+        self._emitted_line = False
+
+    def _end_line(self):
+        output = ""
+        if not self._dirty:
+            output = ("\n" if self._emitted_line else "") + "".join(self._line)
+            self._emitted_line = True
+        self._line = []
+        self._dirty = False
+        self._state = 0
+        return output
+
+    def feed(self, chunk):
+        output = []
+        for char in chunk:
+            if char == "\n":
+                output.append(self._end_line())
+                continue
+            self._line.append(char)
+            if not self._dirty:
+                self._state, length = self._automaton.step(self._state, char)
+                self._dirty = bool(length)
+        return "".join(output)
+
+    def finish(self):
+        output = self._end_line()
+        self._emitted_line = False
+        return output
+
+
+class _PhraseStreamCleaner:
+    """Emits text once no pattern can still start in it (at most max_length - 1 chars are held back)"""
+    def __init__(self, automaton):
+        self._automaton = automaton
+        self._holdback = max(automaton.max_length - 1, 0)
+        self._state = 0
+        self._buffer = []
+        self._buffer_start = 0
+        self._spans = []
+
+    def _emit(self, upto):
+        """Emit buffered text before absolute position upto, skipping matched spans"""
+        output = []
+        position = self._buffer_start
+        while position < upto:
+            if self._spans and self._spans[0][0] <= position:
+                span_start, span_end = self._spans[0]
+                if span_end <= upto:
+                    self._spans.pop(0)
+                position = min(span_end, upto)
+                continue
+            next_stop = min(upto, self._spans[0][0]) if self._spans else upto
+            output.append("".join(self._buffer[position - self._buffer_start:next_stop - self._buffer_start]))
+            position = next_stop
+        del self._buffer[:upto - self._buffer_start]
+        self._buffer_start = upto
+        return "".join(output)
+
+    def feed(self, chunk):
+        for char in chunk:
+            self._buffer.append(char)
+            self._state, length = self._automaton.step(self._state, char)
+            if length:
+                end = self._buffer_start + len(self._buffer)
+                _add_span(self._spans, end - length, end)
+        end = self._buffer_start + len(self._buffer)
+        return self._emit(max(self._buffer_start, end - self._holdback))
+
+    def finish(self):
+        output = self._emit(self._buffer_start + len(self._buffer))
+        self._state = 0
+        return output
@@ -0,0 +1,269 @@
+"""Shared on-disk memory snapshots for multi-worker serving.
+
+A single writer process owns all mutations and publishes immutable
+"generations" (index + memories + cold tier + vectorizer) into a snapshot
+directory, switching the CURRENT pointer with an atomic rename. Reader workers map the
+current generation's FAISS index read-only, so the OS page cache holds one
+copy of the vectors no matter how many workers there are, and swap to a new
+generation when CURRENT changes.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import pickle
+import threading
+import faiss
+
+from config import Config
+from vector_memory import VectorMemory
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_NAME = "vector_index.faiss"
+MEMORIES_NAME = "vector_memories.json"
+VECTORIZER_NAME = "vectorizer.pkl"
+EMBEDDINGS_NAME = "vector_embeddings.f32"
+COLD_MEMORIES_NAME = "cold_memories.json"
+
+# IO_FLAG_MMAP_IFC maps flat codes zero-copy; plain IO_FLAG_MMAP still copies them on older faiss
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+class SnapshotStore:
+    """Directory of published generations plus an atomically replaced CURRENT pointer"""
+    def __init__(self, root=None, keep_generations=None):
+        self.root = root or Config.SNAPSHOT_DIR
+        self.keep_generations = keep_generations or Config.SNAPSHOT_KEEP_GENERATIONS
+        self.generations_dir = os.path.join(self.root, "generations")
+        self.pointer_file = os.path.join(self.root, "CURRENT")
+        os.makedirs(self.generations_dir, exist_ok=True)
+
+    def current(self):
+        """Return (generation number, directory) of the published snapshot, or (None, None)"""
+        try:
+            with open(self.pointer_file, "r") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None, None
+        return int(name), os.path.join(self.generations_dir, name)
+
+    def publish(self, write_files):
+        """Write a new generation with write_files(directory) and make it current"""
+        generation, _ = self.current()
+        generation = (generation or 0) + 1
+        name = f"{generation:010d}"
+
+        staging = os.path.join(self.generations_dir, f".staging-{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        write_files(staging)
+        os.rename(staging, os.path.join(self.generations_dir, name))
+
+        # Readers either see the old pointer or the new one, never a partial write
+        pointer_tmp = f"{self.pointer_file}.{uuid.uuid4().hex}"
+        with open(pointer_tmp, "w") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, self.pointer_file)
+
+        self._collect_garbage(generation)
+        return generation
+
+    def _collect_garbage(self, current_generation):
+        # Old files stay readable for workers that still have them mapped (unlinked inodes live on)
+        for name in os.listdir(self.generations_dir):
+            if name.isdigit() and int(name) <= current_generation - self.keep_generations:
+                shutil.rmtree(os.path.join(self.generations_dir, name), ignore_errors=True)
+
+
+class SnapshotWriterMemory(VectorMemory):
+    """VectorMemory for the writer process: every change is published as a new generation.
+
+    Publishing runs on a background thread and coalesces bursts of writes, so
+    readers lag the writer by at most SNAPSHOT_PUBLISH_INTERVAL.
+    """
+    def __init__(self, snapshot_root=None, publish_interval=None, **kwargs):
+        self.snapshots = SnapshotStore(snapshot_root)
+        self.publish_interval = Config.SNAPSHOT_PUBLISH_INTERVAL if publish_interval is None else publish_interval
+        self._publish_requested = threading.Event()
+        super().__init__(**kwargs)
+
+        # Readers need something to map as soon as they start
+        self.publish_snapshot()
+        self._publisher = threading.Thread(target=self._publish_loop, daemon=True)
+        self._publisher.start()
+
+    def _write_snapshot_files(self, directory):
+        faiss.write_index(self.index, os.path.join(directory, INDEX_NAME))
+        with open(os.path.join(directory, MEMORIES_NAME), "w") as f:
+            json.dump(self.memories, f)
+        with open(os.path.join(directory, VECTORIZER_NAME), "wb") as f:
+            pickle.dump(self.vectorizer, f)
+        with open(os.path.join(directory, COLD_MEMORIES_NAME), "w") as f:
+            json.dump(self.cold_memories, f)
+        # The re-rank file is append-only and replaced (never rewritten) on compaction, so a hard
+        # link pins this generation's rows; its tombstone sidecar says how many rows belong to it
+        if self.rerank and os.path.exists(self.embedding_file):
+            target = os.path.join(directory, EMBEDDINGS_NAME)
+            try:
+                os.link(self.embedding_file, target)
+            except OSError:
+                shutil.copyfile(self.embedding_file, target)
+            if not os.path.exists(self._tombstone_file()):
+                self._save_tombstones(self._row_map()[0])
+            shutil.copyfile(self._tombstone_file(), f"{target}.dead")
+
+    def publish_snapshot(self):
+        """Publish the current state synchronously; returns the new generation number"""
+        with self._lock:
+            generation = self.snapshots.publish(self._write_snapshot_files)
+        logger.debug("Published memory snapshot", extra={"generation": generation, "size": self.index.ntotal})
+        return generation
+
+    def _publish_loop(self):
+        while True:
+            self._publish_requested.wait()
+            time.sleep(self.publish_interval)
+            self._publish_requested.clear()
+            try:
+                self.publish_snapshot()
+            except Exception:
+                logger.error("Error publishing memory snapshot", exc_info=True)
+
+    def save_memories(self):
+        super().save_memories()
+        self._publish_requested.set()
+
+    def save_index(self):
+        super().save_index()
+        self._publish_requested.set()
+
+    def save_cold_memories(self):
+        super().save_cold_memories()
+        self._publish_requested.set()
+
+
+class ReadOnlyVectorMemory(VectorMemory):
+    """VectorMemory for reader workers backed by the writer's published snapshots.
+
+    The FAISS index is memory-mapped read-only; refresh() swaps in a newer
+    generation when the writer publishes one. Access times are applied locally
+    and queued; drain_access() hands them over for forwarding to the writer,
+    whose LRU retention would otherwise only see its own searches.
+    """
+    def __init__(self, snapshot_root=None, poll_interval=None, wait_timeout=None, **kwargs):
+        self.snapshots = SnapshotStore(snapshot_root)
+        self.poll_interval = Config.SNAPSHOT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.generation = None
+        self._last_poll = 0.0
+        self._pending_access = {}
+        super().__init__(**kwargs)
+
+        # Wait for the writer's first snapshot
+        deadline = time.monotonic() + (Config.SNAPSHOT_WAIT_TIMEOUT if wait_timeout is None else wait_timeout)
+        while not self.refresh(force=True):
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"No memory snapshot published in {self.snapshots.root}")
+            time.sleep(0.1)
+
+    def load_memories(self):
+        # State comes from snapshots, not the local files
+        self.memories = []
+        self.memory_ids = []
+
+    def load_index(self):
+        self.index = faiss.IndexFlatL2(self.dimension)
+
+    def load_cold_memories(self):
+        self.cold_memories = []
+
+    def refresh(self, force=False):
+        """Swap to the latest published generation; returns True if one is loaded"""
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return self.generation is not None
+        self._last_poll = now
+
+        generation, directory = self.snapshots.current()
+        if generation is None or generation == self.generation:
+            return self.generation is not None
+
+        try:
+            # Load outside the lock; only the swap itself blocks searches
+            index = faiss.read_index(os.path.join(directory, INDEX_NAME), MMAP_FLAGS)
+            with open(os.path.join(directory, MEMORIES_NAME), "r") as f:
+                memories = json.load(f)
+            with open(os.path.join(directory, VECTORIZER_NAME), "rb") as f:
+                vectorizer = pickle.load(f)
+            cold_path = os.path.join(directory, COLD_MEMORIES_NAME)
+            cold_memories = []
+            if os.path.exists(cold_path):
+                with open(cold_path, "r") as f:
+                    cold_memories = json.load(f)
+        except (OSError, ValueError, RuntimeError):
+            # The generation was garbage-collected under us; pick up the next one on the following poll
+            logger.warning("Could not load memory snapshot", exc_info=True, extra={"generation": generation})
+            return self.generation is not None
+
+        with self._lock:
+            self.index = index
+            self.memories = memories
+            self.memory_ids = [mem["id"] for mem in memories]
+            self.cold_memories = cold_memories
+            self.vectorizer = vectorizer
+            self.embedding_file = os.path.join(directory, EMBEDDINGS_NAME)
+            self.generation = generation
+            self._reset_bookkeeping()
+        logger.debug("Loaded memory snapshot", extra={"generation": generation, "size": index.ntotal})
+        return True
+
+    def _touch(self, memory, timestamp=None):
+        super()._touch(memory, timestamp)
+        self._pending_access[memory["id"]] = memory["last_accessed"]
+
+    def drain_access(self):
+        """Return and clear the access times recorded since the last call (memory ID -> ISO timestamp)"""
+        with self._lock:
+            accessed, self._pending_access = self._pending_access, {}
+        return accessed
+
+    def requeue_access(self, accessed):
+        """Put back access times that could not be delivered, keeping the newer of each"""
+        with self._lock:
+            for memory_id, timestamp in accessed.items():
+                if timestamp > self._pending_access.get(memory_id, ""):
+                    self._pending_access[memory_id] = timestamp
+
+    # Readers never deduplicate, so skip building the MinHash index on every swap
+    def _index_content(self, memory, signature=None):
+        pass
+
+    def _unindex_content(self, memory):
+        pass
+
+    # Persistence belongs to the writer
+    def save_memories(self):
+        pass
+
+    def save_index(self):
+        pass
+
+    def save_cold_memories(self):
+        pass
+
+    def start_retention_worker(self, interval=None):
+        pass
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("This worker serves a read-only memory snapshot; send writes to the writer process")
+
+    add_memory = _read_only
+    add_or_merge_memory = _read_only
+    update_memory = _read_only
+    delete_memory = _read_only
+    add_tag_to_memory = _read_only
+    collapse_duplicates = _read_only
+    enforce_retention = _read_only
@@ -0,0 +1,54 @@
+"""Lazy heaps used by retention and memory stats stay bounded and return live entries."""
+import pytest
+
+from config import Config
+from vector_memory import VectorMemory, RetentionPolicy, _LazyHeap
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Config, "MEMORY_RETENTION_INTERVAL", 3600)
+    return VectorMemory(retention_policy=RetentionPolicy(max_items=20, action="evict"), deduplicate=False)
+
+
+def test_lazy_heap_skips_stale_entries():
+    heap = _LazyHeap()
+    current = {1: "b", 2: "c"}
+    for key, memory_id in (("a", 1), ("b", 1), ("c", 2)):
+        heap.push(key, memory_id)
+    is_current = lambda key, memory_id: current.get(memory_id) == key
+    assert heap.pop(is_current) == ("b", 1)
+    assert heap.pop(is_current) == ("c", 2)
+    assert heap.pop(is_current) is None
+
+
+def test_descending_lazy_heap():
+    heap = _LazyHeap(descending=True)
+    for key in ("a", "c", "b"):
+        heap.push(key, key)
+    assert heap.pop(lambda key, memory_id: True) == ("c", "c")
+
+
+def test_heaps_stay_bounded_under_churn(store):
+    for i in range(600):
+        store.add_memory(f"memory number {i} about topic {i % 7}", tags=[f"t{i % 3}"])
+        store.enforce_retention()
+        if i % 5 == 0 and store.memories:
+            store.update_memory(store.memories[0]["id"], tags=["retagged"])
+            store.search_memories(f"topic {i % 7}")
+    limit = 2 * len(store.memories) + 64
+    assert len(store.memories) <= 20
+    assert len(store._lru_heap) <= limit
+    assert len(store._ttl_heap) <= limit
+    for heap in (store._stats._oldest, store._stats._newest, store._stats._recent):
+        assert len(heap) <= limit
+
+
+def test_stats_track_live_memories(store):
+    ids = [store.add_memory(f"distinct memory {i} with words", tags=["x"]) for i in range(10)]
+    store.delete_memory(ids[0])
+    store.delete_memory(ids[-1])
+    stats = store.get_memory_stats()
+    assert stats["oldest_memory"]["id"] == ids[1]
+    assert stats["newest_memory"]["id"] == ids[-2]
@@ -0,0 +1,63 @@
+"""Streamed cleaning must match cleaning the whole text, however the stream is chunked."""
+import random
+
+import pytest
+
+from response_cleaner import ResponseCleaner
+
+PATTERNS = ["AI response", "effective AI response", "I've", "ab", "bab", "My goal is"]
+ALPHABET = ["a", "b", " ", "\n", "x", "I've", "AI response", "My goal", " is", "effective "]
+
+
+def naive_line_clean(text, patterns):
+    return "\n".join(line for line in text.split("\n") if not any(p in line for p in patterns))
+
+
+def naive_phrase_clean(text, patterns):
+    covered = [False] * len(text)
+    for pattern in patterns:
+        start = text.find(pattern)
+        while start != -1:
+            for i in range(start, start + len(pattern)):
+                covered[i] = True
+            start = text.find(pattern, start + 1)
+    return "".join(char for char, drop in zip(text, covered) if not drop)
+
+
+def random_chunks(rng, text):
+    chunks, position = [], 0
+    while position < len(text):
+        size = rng.randint(0, 6)
+        chunks.append(text[position:position + size])
+        position += size
+    return chunks
+
+
+def stream_clean(cleaner, chunks, mode):
+    stream = cleaner.stream(mode)
+    return "".join(stream.feed(chunk) for chunk in chunks) + stream.finish()
+
+
+@pytest.mark.parametrize("mode, naive", [("line", naive_line_clean), ("phrase", naive_phrase_clean)])
+def test_stream_matches_whole_text(mode, naive):
+    rng = random.Random(0)
+    cleaner = ResponseCleaner(patterns=PATTERNS, mode=mode)
+    for _ in range(500):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+        expected = naive(text, PATTERNS)
+        assert cleaner.clean(text) == expected, text
+        assert stream_clean(cleaner, random_chunks(rng, text), mode) == expected, text
+
+
+def test_line_mode_drops_trailing_line_without_extra_newline():
+    cleaner = ResponseCleaner(patterns=["drop"], mode="line")
+    assert stream_clean(cleaner, ["keep\nkeep too\n", "dr", "op me"], "line") == "keep\nkeep too"
+    assert stream_clean(cleaner, ["drop\n", "keep"], "line") == "keep"
+
+
+def test_phrase_mode_holds_back_less_than_longest_pattern():
+    cleaner = ResponseCleaner(patterns=["secret"], mode="phrase")
+    stream = cleaner.stream()
+    assert stream.feed("hello world") == "hello "
+    assert stream.feed(" secret!") == "world "
+    assert stream.finish() == "!"
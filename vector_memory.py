@@ -1,22 +1,224 @@
 import os
 import json
+import heapq
+import random
+import threading
+from collections import Counter
 import numpy as np
 import faiss
-from datetime import datetime
+from datetime import datetime, timedelta
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
+from bisect import bisect_right
+
+from config import Config
+from memory_dedup import MinHashLSH, content_hash
+from logging_config import get_logger
+from metrics import timed
+
+logger = get_logger(__name__)
+
+# Index classes accepted for each MEMORY_INDEX_TYPE
+INDEX_CLASSES = {
+    "flat": faiss.IndexFlat,
+    "sq16": faiss.IndexScalarQuantizer,
+    "pq": faiss.IndexPQ
+}
+
+
+def pq_min_training_vectors():
+    """Vectors needed to train PQ codebooks: k-means wants at least 39 points per centroid (2**bits of them)"""
+    return max(Config.MEMORY_PQ_MIN_VECTORS, 39 * (1 << Config.MEMORY_PQ_BITS))
+
+
+class RetentionPolicy:
+    """Retention rules for the hot (indexed) memory tier"""
+    def __init__(self, max_items=None, ttl_seconds=None, pinned_tags=None, action="demote", batch_size=50):
+        if action not in ("demote", "evict"):
+            raise ValueError(f"Unknown retention action: {action}")
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.pinned_tags = set(pinned_tags or [])
+        self.action = action
+        self.batch_size = batch_size
+    
+    @classmethod
+    def from_config(cls):
+        """Build a policy from the Config defaults"""
+        ttl_days = Config.MEMORY_TTL_DAYS
+        return cls(
+            max_items=Config.MAX_MEMORY_ITEMS,
+            ttl_seconds=ttl_days * 86400 if ttl_days else None,
+            pinned_tags=Config.MEMORY_PINNED_TAGS,
+            action=Config.MEMORY_EVICTION_ACTION,
+            batch_size=Config.MEMORY_EVICTION_BATCH_SIZE
+        )
+    
+    def is_pinned(self, memory):
+        """Pinned memories are never evicted or demoted"""
+        return any(tag in self.pinned_tags for tag in memory["tags"])
+
+
+class _Descending:
+    """Key wrapper that inverts ordering so heapq behaves as a max-heap"""
+    __slots__ = ("value",)
+    
+    def __init__(self, value):
+        self.value = value
+    
+    def __lt__(self, other):
+        return self.value > other.value
+    
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class _LazyHeap:
+    """Min-heap (or max-heap) of (key, memory_id) entries; stale entries are dropped when they surface"""
+    def __init__(self, descending=False):
+        self._heap = []
+        self._descending = descending
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def _wrap(self, key):
+        return _Descending(key) if self._descending else key
+    
+    def push(self, key, memory_id):
+        heapq.heappush(self._heap, (self._wrap(key), memory_id))
+    
+    def peek(self, is_current):
+        """Return the first entry in heap order for which is_current(key, memory_id) holds"""
+        while self._heap:
+            key, memory_id = self._heap[0]
+            if self._descending:
+                key = key.value
+            if is_current(key, memory_id):
+                return key, memory_id
+            heapq.heappop(self._heap)
+        return None
+    
+    def pop(self, is_current):
+        entry = self.peek(is_current)
+        if entry is not None:
+            heapq.heappop(self._heap)
+        return entry
+    
+    def rebuild(self, entries):
+        """Replace the heap contents, discarding accumulated stale entries"""
+        self._heap = [(self._wrap(key), memory_id) for key, memory_id in entries]
+        heapq.heapify(self._heap)
+
+
+class _MemoryStats:
+    """Running statistics over the hot tier, updated as memories change"""
+    def __init__(self):
+        self.tag_counts = Counter()
+        self._oldest = _LazyHeap()
+        self._newest = _LazyHeap(descending=True)
+        self._recent = _LazyHeap(descending=True)
+    
+    def reset(self, memories):
+        self.tag_counts = Counter(tag for mem in memories for tag in mem["tags"])
+        self._oldest.rebuild((mem["created_at"], mem["id"]) for mem in memories)
+        self._newest.rebuild((mem["created_at"], mem["id"]) for mem in memories)
+        self._recent.rebuild((mem["last_accessed"], mem["id"]) for mem in memories)
+    
+    def added(self, memory, memories):
+        self.tag_counts.update(memory["tags"])
+        self._oldest.push(memory["created_at"], memory["id"])
+        self._newest.push(memory["created_at"], memory["id"])
+        self._recent.push(memory["last_accessed"], memory["id"])
+        self._compact(memories)
+    
+    def removed(self, memory, memories):
+        # Heap entries for removed memories are discarded lazily (or on compaction)
+        self._untag(memory["tags"])
+        self._compact(memories)
+    
+    def retagged(self, old_tags, new_tags):
+        self._untag(old_tags)
+        self.tag_counts.update(new_tags)
+    
+    def touched(self, memory, memories):
+        self._recent.push(memory["last_accessed"], memory["id"])
+        self._compact(memories)
+    
+    def _compact(self, memories):
+        # Stale entries of removed memories can sit below live ones in a max-heap and never surface
+        limit = 2 * len(memories) + 64
+        if len(self._oldest) > limit:
+            self._oldest.rebuild((mem["created_at"], mem["id"]) for mem in memories)
+        if len(self._newest) > limit:
+            self._newest.rebuild((mem["created_at"], mem["id"]) for mem in memories)
+        if len(self._recent) > limit:
+            self._recent.rebuild((mem["last_accessed"], mem["id"]) for mem in memories)
+    
+    def _untag(self, tags):
+        for tag in tags:
+            self.tag_counts[tag] -= 1
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+    
+    def snapshot(self, memory_by_id):
+        def lookup(heap, field):
+            def is_current(key, memory_id):
+                memory = memory_by_id.get(memory_id)
+                return memory is not None and memory[field] == key
+            entry = heap.peek(is_current)
+            return memory_by_id[entry[1]] if entry else None
+        
+        return {
+            "total_memories": len(memory_by_id),
+            "total_tags": len(self.tag_counts),
+            "tags_frequency": dict(self.tag_counts),
+            "newest_memory": lookup(self._newest, "created_at"),
+            "oldest_memory": lookup(self._oldest, "created_at"),
+            "most_accessed_memory": lookup(self._recent, "last_accessed")
+        }
+
 
 class VectorMemory:
-    def __init__(self, dimension=100, memory_file="vector_memories.json", index_file="vector_index.faiss", vectorizer_file="vectorizer.pkl"):
+    def __init__(self, dimension=100, memory_file="vector_memories.json", index_file="vector_index.faiss", vectorizer_file="vectorizer.pkl",
+                 cold_memory_file="cold_memories.json", retention_policy=None, deduplicate=None, merge_duplicate_tags=None,
+                 index_type=None, rerank=None, embedding_file="vector_embeddings.f32"):
         self.dimension = dimension
         self.memory_file = memory_file
         self.index_file = index_file
         self.vectorizer_file = vectorizer_file
+        self.cold_memory_file = cold_memory_file
+        self.embedding_file = embedding_file
+        self._row_cache = None  # (embedding file, dead-row flags, file row of each index position)
+        self.index_type = index_type or Config.MEMORY_INDEX_TYPE
+        if self.index_type not in INDEX_CLASSES:
+            raise ValueError(f"Unknown index type: {self.index_type}")
+        self.rerank = Config.MEMORY_RERANK if rerank is None else rerank
+        self.retention_policy = retention_policy or RetentionPolicy.from_config()
+        self.deduplicate = Config.MEMORY_DEDUPLICATE if deduplicate is None else deduplicate
+        self.merge_duplicate_tags = Config.MEMORY_MERGE_DUPLICATE_TAGS if merge_duplicate_tags is None else merge_duplicate_tags
         
         # Initialize memories list
         self.memories = []
         self.memory_ids = []
         
+        # Cold tier: demoted memories kept on disk but not in the vector index
+        self.cold_memories = []
+        
+        # Lookup and eviction bookkeeping
+        self._memory_by_id = {}
+        self._lru_heap = _LazyHeap()
+        self._ttl_heap = _LazyHeap()
+        self._stats = _MemoryStats()
+        self._next_id = 1
+        self._content_hashes = {}
+        self._lsh = MinHashLSH(threshold=Config.MEMORY_NEAR_DUPLICATE_THRESHOLD)
+        self._lock = threading.RLock()
+        self._retention_thread = None
+        self._retention_wakeup = threading.Event()
+        self._retention_stop = threading.Event()
+        self._unsaved_access = False
+        
         # Initialize or load vectorizer
         if os.path.exists(self.vectorizer_file):
             with open(self.vectorizer_file, 'rb') as f:
@@ -30,8 +232,12 @@ class VectorMemory:
             self.load_index()
         else:
             # Create a new index
-            self.index = faiss.IndexFlatL2(self.dimension)
+            self.index = self._new_index()
+        
+        self.load_cold_memories()
+        self._reset_bookkeeping()
     
+    @timed("vector_memory_load_memories")
     def load_memories(self):
         """Load memories from file"""
         try:
@@ -39,12 +245,12 @@ class VectorMemory:
                 with open(self.memory_file, 'r') as f:
                     self.memories = json.load(f)
                 self.memory_ids = [mem["id"] for mem in self.memories]
-                print(f"Loaded {len(self.memories)} memories from {self.memory_file}")
+                logger.info("Loaded memories", extra={"count": len(self.memories), "file": self.memory_file})
             else:
                 self.memories = []
                 self.memory_ids = []
-        except Exception as e:
-            print(f"Error loading memories: {e}")
+        except Exception:
+            logger.error("Error loading memories", exc_info=True, extra={"file": self.memory_file})
             self.memories = []
             self.memory_ids = []
     
@@ -53,26 +259,56 @@ class VectorMemory:
         try:
             if os.path.exists(self.index_file) and self.memories:
                 self.index = faiss.read_index(self.index_file)
-                print(f"Loaded vector index from {self.index_file}")
+                logger.info("Loaded vector index", extra={"file": self.index_file, "size": self.index.ntotal})
+                # Rebuild if MEMORY_INDEX_TYPE changed or the re-rank vectors are missing
+                if self._index_needs_rebuild():
+                    self._rebuild_index()
+                    self.save_index()
             else:
                 # Create a new index
-                self.index = faiss.IndexFlatL2(self.dimension)
+                self.index = self._new_index()
                 # If we have memories but no index, rebuild the index
                 if self.memories:
                     self._rebuild_index()
-        except Exception as e:
-            print(f"Error loading index: {e}")
-            self.index = faiss.IndexFlatL2(self.dimension)
+                    self.save_index()
+        except Exception:
+            logger.error("Error loading index", exc_info=True, extra={"file": self.index_file})
+            self.index = self._new_index()
     
+    @timed("vector_memory_save_memories")
     def save_memories(self):
         """Save memories to file"""
+        self._write_memories_file()
+    
+    def _write_memories_file(self):
         try:
             with open(self.memory_file, 'w') as f:
                 json.dump(self.memories, f, indent=2)
-            print(f"Saved {len(self.memories)} memories to {self.memory_file}")
-        except Exception as e:
-            print(f"Error saving memories: {e}")
+            logger.debug("Saved memories", extra={"count": len(self.memories), "file": self.memory_file})
+        except Exception:
+            logger.error("Error saving memories", exc_info=True, extra={"file": self.memory_file})
+    
+    def load_cold_memories(self):
+        """Load demoted memories from the cold tier file"""
+        try:
+            if os.path.exists(self.cold_memory_file):
+                with open(self.cold_memory_file, 'r') as f:
+                    self.cold_memories = json.load(f)
+            else:
+                self.cold_memories = []
+        except Exception:
+            logger.error("Error loading cold memories", exc_info=True, extra={"file": self.cold_memory_file})
+            self.cold_memories = []
+    
+    def save_cold_memories(self):
+        """Save the cold tier to file"""
+        try:
+            with open(self.cold_memory_file, 'w') as f:
+                json.dump(self.cold_memories, f, indent=2)
+        except Exception:
+            logger.error("Error saving cold memories", exc_info=True, extra={"file": self.cold_memory_file})
     
+    @timed("vector_memory_save_index")
     def save_index(self):
         """Save the FAISS index to file"""
         try:
@@ -80,12 +316,13 @@ class VectorMemory:
             # Save the vectorizer
             with open(self.vectorizer_file, 'wb') as f:
                 pickle.dump(self.vectorizer, f)
-            print(f"Saved vector index to {self.index_file}")
-        except Exception as e:
-            print(f"Error saving index: {e}")
+            logger.debug("Saved vector index", extra={"file": self.index_file, "size": self.index.ntotal})
+        except Exception:
+            logger.error("Error saving index", exc_info=True, extra={"file": self.index_file})
     
+    @timed("vector_memory_rebuild_index")
     def _rebuild_index(self):
-        """Rebuild the vector index from memories"""
+        """Rebuild the vector index from memories, vectorizing a batch at a time to bound peak memory"""
         if not self.memories:
             return
         
@@ -96,215 +333,696 @@ class VectorMemory:
         if not hasattr(self.vectorizer, 'vocabulary_'):
             self.vectorizer.fit(texts)
         
-        # Transform texts to vectors
-        vectors = self.vectorizer.transform(texts).toarray().astype('float32')
+        # PQ codebooks are trained on a sample rather than the whole corpus
+        training_vectors = None
+        if self.index_type == "pq" and len(texts) >= pq_min_training_vectors():
+            sample_size = max(Config.MEMORY_PQ_TRAINING_SAMPLE, pq_min_training_vectors())
+            sample = random.Random(0).sample(range(len(texts)), min(len(texts), sample_size))
+            training_vectors = self._vectorize_batch([texts[i] for i in sorted(sample)])
         
         # Create a new index
-        self.index = faiss.IndexFlatL2(self.dimension)
+        self.index = self._new_index(training_vectors)
+        training_vectors = None
         
-        # Add vectors to index
-        if vectors.shape[0] > 0:
-            self.index.add(vectors)
+        # Add vectors to the index (and the re-rank file) one batch at a time
+        embeddings = open(f"{self.embedding_file}.tmp", 'wb') if self.rerank else None
+        try:
+            batch_size = Config.MEMORY_REBUILD_BATCH_SIZE or len(texts)
+            for start in range(0, len(texts), batch_size):
+                vectors = self._vectorize_batch(texts[start:start + batch_size])
+                self.index.add(vectors)
+                if embeddings:
+                    embeddings.write(vectors.tobytes())
+        finally:
+            if embeddings:
+                embeddings.close()
+        if embeddings:
+            os.replace(f"{self.embedding_file}.tmp", self.embedding_file)
+            self._save_tombstones(np.zeros(len(texts), dtype=bool))
+    
+    def _new_index(self, training_vectors=None):
+        """Create an empty index of the configured type; PQ needs training vectors"""
+        if self.index_type == "sq16":
+            return faiss.IndexScalarQuantizer(self.dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        if self.index_type == "pq" and training_vectors is not None:
+            index = faiss.IndexPQ(self.dimension, Config.MEMORY_PQ_SUBQUANTIZERS, Config.MEMORY_PQ_BITS)
+            index.train(training_vectors)
+            return index
+        # PQ without enough vectors to train stays exact until the store grows
+        return faiss.IndexFlatL2(self.dimension)
+    
+    def _index_needs_rebuild(self):
+        """True if the index is not of the configured type or the re-rank vectors are out of step"""
+        if self.index_type == "pq" and self.index.ntotal < pq_min_training_vectors():
+            type_matches = isinstance(self.index, (faiss.IndexFlat, faiss.IndexPQ))
+        else:
+            type_matches = isinstance(self.index, INDEX_CLASSES[self.index_type])
+        return not type_matches or (self.rerank and self._embedding_rows() != self.index.ntotal)
+    
+    # The re-rank file is append-only: deleted rows are only marked in a tombstone sidecar
+    # (row count + packed bitmap) and dropped when the file is compacted or the index rebuilt.
+    
+    def _tombstone_file(self):
+        return f"{self.embedding_file}.dead"
+    
+    def _row_map(self):
+        """Return (dead-row flags, file row of each index position) for the current re-rank file"""
+        if self._row_cache is None or self._row_cache[0] != self.embedding_file:
+            dead = np.zeros(0, dtype=bool)
+            if os.path.exists(self._tombstone_file()):
+                with open(self._tombstone_file(), 'rb') as f:
+                    rows = int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+                    dead = np.unpackbits(np.frombuffer(f.read(), dtype=np.uint8), count=rows).astype(bool)
+            elif os.path.exists(self.embedding_file):
+                # Written before tombstones existed: every row is live
+                dead = np.zeros(os.path.getsize(self.embedding_file) // (self.dimension * 4), dtype=bool)
+            self._row_cache = (self.embedding_file, dead, np.flatnonzero(~dead))
+        return self._row_cache[1], self._row_cache[2]
+    
+    def _save_tombstones(self, dead):
+        with open(f"{self._tombstone_file()}.tmp", 'wb') as f:
+            f.write(np.int64(len(dead)).tobytes())
+            f.write(np.packbits(dead).tobytes())
+        os.replace(f"{self._tombstone_file()}.tmp", self._tombstone_file())
+        self._row_cache = (self.embedding_file, dead, np.flatnonzero(~dead))
+    
+    def _embedding_rows(self):
+        """Live rows in the re-rank file (one per index position when in step)"""
+        return len(self._row_map()[1])
+    
+    def _append_embeddings(self, vectors):
+        """Keep the uncompressed float32 vectors on disk, row-aligned with the index"""
+        if self.rerank:
+            dead, _ = self._row_map()
+            with open(self.embedding_file, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            self._save_tombstones(np.concatenate([dead, np.zeros(len(vectors), dtype=bool)]))
+    
+    def _remove_embeddings(self, positions):
+        """Tombstone the rows of removed index positions; compact once most of the file is dead"""
+        if not self.rerank:
+            return
+        dead, live = self._row_map()
+        positions = [p for p in positions if p < len(live)]
+        if not positions:
+            return
+        dead = dead.copy()
+        dead[live[positions]] = True
+        if dead.sum() > len(dead) - dead.sum():
+            self._compact_embeddings(dead)
+        else:
+            self._save_tombstones(dead)
+    
+    def _compact_embeddings(self, dead):
+        """Rewrite the re-rank file with only its live rows, a batch at a time"""
+        embeddings = np.memmap(self.embedding_file, dtype=np.float32, mode='r', shape=(len(dead), self.dimension))
+        batch_size = Config.MEMORY_REBUILD_BATCH_SIZE or len(dead)
+        with open(f"{self.embedding_file}.tmp", 'wb') as f:
+            for start in range(0, len(dead), batch_size):
+                keep = ~dead[start:start + batch_size]
+                f.write(np.ascontiguousarray(embeddings[start:start + batch_size][keep]).tobytes())
+        del embeddings
+        # A new file (not an in-place rewrite), so snapshots linking the old one keep their rows
+        os.replace(f"{self.embedding_file}.tmp", self.embedding_file)
+        self._save_tombstones(np.zeros(int((~dead).sum()), dtype=bool))
+    
+    def _rerank(self, query_vector, indices, k):
+        """Exact L2 distances for the compressed index's candidates, read from the vectors on disk"""
+        dead, live = self._row_map()
+        # Sorted positions map to increasing file rows, so the memmap gather reads forward
+        candidates = np.sort(indices[(indices >= 0) & (indices < len(live))])
+        embeddings = np.memmap(self.embedding_file, dtype=np.float32, mode='r', shape=(len(dead), self.dimension))
+        distances = ((embeddings[live[candidates]] - query_vector) ** 2).sum(axis=1)
+        # Stable sort breaks ties by position, as the exact flat index does
+        order = np.argsort(distances, kind="stable")[:k]
+        return distances[order][None, :], candidates[order][None, :]
+    
+    def _reset_bookkeeping(self):
+        """Rebuild id lookup and eviction heaps from the current memories"""
+        self._memory_by_id = {mem["id"]: mem for mem in self.memories}
+        self._lru_heap.rebuild((mem["last_accessed"], mem["id"]) for mem in self.memories)
+        self._ttl_heap.rebuild((mem["created_at"], mem["id"]) for mem in self.memories)
+        self._stats.reset(self.memories)
+        self._content_hashes = {}
+        self._lsh = MinHashLSH(threshold=self._lsh.threshold)
+        for mem in self.memories:
+            self._index_content(mem)
+        all_ids = self.memory_ids + [mem["id"] for mem in self.cold_memories]
+        self._next_id = max(all_ids) + 1 if all_ids else 1
+    
+    def _index_content(self, memory, signature=None):
+        """Register a memory's content for duplicate detection"""
+        if signature is None:
+            signature = self._lsh.signature(memory["content"])
+        self._content_hashes.setdefault(content_hash(memory["content"]), memory["id"])
+        self._lsh.insert(memory["id"], signature)
+    
+    def _unindex_content(self, memory):
+        digest = content_hash(memory["content"])
+        if self._content_hashes.get(digest) == memory["id"]:
+            del self._content_hashes[digest]
+        self._lsh.remove(memory["id"])
+    
+    def find_duplicate(self, content, signature=None):
+        """Return an existing hot memory that duplicates or nearly duplicates content"""
+        with self._lock:
+            memory_id = self._content_hashes.get(content_hash(content))
+            if memory_id is None:
+                if signature is None:
+                    signature = self._lsh.signature(content)
+                matches = self._lsh.query(signature)
+                memory_id = matches[0][0] if matches else None
+            return self._memory_by_id.get(memory_id)
+    
+    def _merge_tags(self, memory, tags):
+        """Fold tags into an existing memory; returns True if anything changed"""
+        new_tags = [tag for tag in tags if tag not in memory["tags"]]
+        if not new_tags:
+            return False
+        memory["tags"].extend(new_tags)
+        self._stats.retagged([], new_tags)
+        self._reschedule(memory)
+        return True
+    
+    def collapse_duplicates(self):
+        """Merge duplicate and near-duplicate memories already in the store; returns how many were removed"""
+        with self._lock:
+            lsh = MinHashLSH(threshold=self._lsh.threshold)
+            seen_hashes = {}
+            duplicate_ids = []
+            for memory in self.memories:
+                digest = content_hash(memory["content"])
+                signature = lsh.signature(memory["content"])
+                original_id = seen_hashes.get(digest)
+                if original_id is None:
+                    matches = lsh.query(signature)
+                    original_id = matches[0][0] if matches else None
+                
+                if original_id is None:
+                    seen_hashes[digest] = memory["id"]
+                    lsh.insert(memory["id"], signature)
+                    continue
+                
+                # Keep the oldest copy and fold the duplicate's tags into it
+                self._merge_tags(self._memory_by_id[original_id], memory["tags"])
+                duplicate_ids.append(memory["id"])
+            
+            if duplicate_ids:
+                self._remove_from_hot_tier(duplicate_ids)
+                self.save_memories()
+                self.save_index()
+            return len(duplicate_ids)
+    
+    def _touch(self, memory, timestamp=None):
+        """Mark a memory as accessed at timestamp (default now)"""
+        memory["last_accessed"] = timestamp or datetime.now().isoformat()
+        self._lru_heap.push(memory["last_accessed"], memory["id"])
+        self._stats.touched(memory, self.memories)
+        
+        # Stale heap entries pile up with every access; compact occasionally
+        if len(self._lru_heap) > 2 * len(self.memories) + 64:
+            self._lru_heap.rebuild((mem["last_accessed"], mem["id"]) for mem in self.memories)
+    
+    def _reschedule(self, memory):
+        """Re-queue a memory for retention checks, e.g. after its tags changed"""
+        self._lru_heap.push(memory["last_accessed"], memory["id"])
+        self._ttl_heap.push(memory["created_at"], memory["id"])
+        
+        # Entries for removed memories never surface when TTL is off; compact like _touch does
+        limit = 2 * len(self.memories) + 64
+        if len(self._lru_heap) > limit:
+            self._lru_heap.rebuild((mem["last_accessed"], mem["id"]) for mem in self.memories)
+        if len(self._ttl_heap) > limit:
+            self._ttl_heap.rebuild((mem["created_at"], mem["id"]) for mem in self.memories)
+    
+    def _collect_retention_victims(self):
+        """Pick up to one batch of memories that violate the retention policy"""
+        policy = self.retention_policy
+        victims = []
+        seen = set()
+        
+        def is_current(field):
+            def check(key, memory_id):
+                memory = self._memory_by_id.get(memory_id)
+                return memory is not None and memory_id not in seen and memory[field] == key
+            return check
+        
+        # TTL: everything created before the cutoff goes first
+        if policy.ttl_seconds:
+            cutoff = (datetime.now() - timedelta(seconds=policy.ttl_seconds)).isoformat()
+            check = is_current("created_at")
+            while len(victims) < policy.batch_size:
+                entry = self._ttl_heap.peek(check)
+                if entry is None or entry[0] >= cutoff:
+                    break
+                self._ttl_heap.pop(check)
+                memory = self._memory_by_id[entry[1]]
+                if not policy.is_pinned(memory):
+                    victims.append(memory)
+                    seen.add(memory["id"])
+        
+        # LRU: least recently accessed until we are back under the cap
+        if policy.max_items is not None:
+            check = is_current("last_accessed")
+            while len(victims) < policy.batch_size and len(self.memories) - len(victims) > policy.max_items:
+                entry = self._lru_heap.pop(check)
+                if entry is None:
+                    break
+                memory = self._memory_by_id[entry[1]]
+                if not policy.is_pinned(memory):
+                    victims.append(memory)
+                    seen.add(memory["id"])
+        
+        return victims
+    
+    def _remove_from_hot_tier(self, memory_ids):
+        """Drop memories from the hot list and the vector index without a full rebuild"""
+        memory_ids = set(memory_ids)
+        positions = [i for i, mem in enumerate(self.memories) if mem["id"] in memory_ids]
+        if not positions:
+            return []
+        
+        # Flat and quantized indexes compact in order on removal, so positions stay aligned with self.memories
+        self.index.remove_ids(np.array(positions, dtype='int64'))
+        self._remove_embeddings(positions)
+        removed = [self.memories[i] for i in positions]
+        self.memories = [mem for mem in self.memories if mem["id"] not in memory_ids]
+        self.memory_ids = [mem["id"] for mem in self.memories]
+        for memory in removed:
+            self._memory_by_id.pop(memory["id"], None)
+            self._stats.removed(memory, self.memories)
+            self._unindex_content(memory)
+        return removed
+    
+    @timed("vector_memory_enforce_retention")
+    def enforce_retention(self):
+        """Evict or demote one batch of memories; returns how many were processed"""
+        with self._lock:
+            victims = self._collect_retention_victims()
+            if not victims:
+                return 0
+            
+            removed = self._remove_from_hot_tier(mem["id"] for mem in victims)
+            if self.retention_policy.action == "demote":
+                self.cold_memories.extend(removed)
+                self.save_cold_memories()
+            
+            self.save_memories()
+            self.save_index()
+            return len(removed)
+    
+    def _retention_needed(self):
+        policy = self.retention_policy
+        if policy.max_items is not None and len(self.memories) > policy.max_items:
+            return True
+        if policy.ttl_seconds:
+            cutoff = (datetime.now() - timedelta(seconds=policy.ttl_seconds)).isoformat()
+            entry = self._ttl_heap.peek(lambda key, memory_id: memory_id in self._memory_by_id)
+            return entry is not None and entry[0] < cutoff
+        return False
+    
+    def _retention_loop(self, interval):
+        while not self._retention_stop.is_set():
+            # Work in batches, releasing the lock in between so requests are not starved
+            while not self._retention_stop.is_set() and self.enforce_retention():
+                pass
+            self.persist_access_times()
+            self._retention_wakeup.wait(interval)
+            self._retention_wakeup.clear()
+    
+    def start_retention_worker(self, interval=None):
+        """Run retention enforcement incrementally in a background thread"""
+        if self._retention_thread and self._retention_thread.is_alive():
+            return
+        if interval is None:
+            interval = Config.MEMORY_RETENTION_INTERVAL
+        self._retention_stop.clear()
+        self._retention_thread = threading.Thread(target=self._retention_loop, args=(interval,), daemon=True)
+        self._retention_thread.start()
+    
+    def stop_retention_worker(self):
+        """Stop the background retention thread"""
+        self._retention_stop.set()
+        self._retention_wakeup.set()
+        if self._retention_thread:
+            self._retention_thread.join()
+            self._retention_thread = None
+        self.persist_access_times()
+    
+    def schedule_retention(self):
+        """Hand retention work to the background worker, or do one batch inline"""
+        if not self._retention_needed():
+            return
+        if self._retention_thread and self._retention_thread.is_alive():
+            self._retention_wakeup.set()
+        else:
+            self.enforce_retention()
     
     def _vectorize_text(self, text):
         """Convert text to vector"""
         # If vectorizer is not fitted yet, fit it
         if not hasattr(self.vectorizer, 'vocabulary_'):
             self.vectorizer.fit([text])
-            
-        # Transform text to vector
-        vector = self.vectorizer.transform([text]).toarray().astype('float32')
         
-        # Ensure vector has the correct dimension
-        if vector.shape[1] != self.dimension:
+        return self._vectorize_batch([text])
+    
+    def _vectorize_batch(self, texts):
+        """Convert texts to a (len(texts), dimension) float32 array with a fitted vectorizer"""
+        vectors = self.vectorizer.transform(texts).toarray().astype('float32')
+        
+        # Ensure vectors have the correct dimension
+        if vectors.shape[1] != self.dimension:
             # Pad or truncate to match the expected dimension
-            padded_vector = np.zeros((1, self.dimension), dtype=np.float32)
-            copy_dim = min(vector.shape[1], self.dimension)
-            padded_vector[0, :copy_dim] = vector[0, :copy_dim]
-            return padded_vector
-            
-        return vector
+            padded = np.zeros((vectors.shape[0], self.dimension), dtype=np.float32)
+            copy_dim = min(vectors.shape[1], self.dimension)
+            padded[:, :copy_dim] = vectors[:, :copy_dim]
+            return padded
+        
+        return vectors
     
     def add_memory(self, content, tags=None, source=None):
-        """Add a new memory with vector embedding"""
+        """Add a new memory with vector embedding; returns its ID (or the ID of the memory it duplicates)"""
+        memory_id, _ = self.add_or_merge_memory(content, tags, source)
+        return memory_id
+    
+    @timed("vector_memory_add")
+    def add_or_merge_memory(self, content, tags=None, source=None):
+        """Add a new memory unless it duplicates one; returns (memory ID, True if a new memory was created)"""
         if tags is None:
             tags = []
-            
-        # Generate a new ID
-        new_id = 1
-        if self.memory_ids:
-            new_id = max(self.memory_ids) + 1
-        
-        # Create memory object
-        memory = {
-            "id": new_id,
-            "content": content,
-            "tags": tags,
-            "source": source,
-            "created_at": datetime.now().isoformat(),
-            "last_accessed": datetime.now().isoformat()
-        }
-        
-        # Add to memories list
-        self.memories.append(memory)
-        self.memory_ids.append(new_id)
         
-        # Add to vector index
-        vector = self._vectorize_text(content)
-        self.index.add(vector)
-        
-        # Save changes
-        self.save_memories()
-        self.save_index()
+        with self._lock:
+            # Collapse duplicates into the existing memory instead of inserting
+            signature = self._lsh.signature(content)
+            if self.deduplicate:
+                existing = self.find_duplicate(content, signature=signature)
+                if existing is not None:
+                    if self.merge_duplicate_tags and self._merge_tags(existing, tags):
+                        self._touch(existing)
+                        self.save_memories()
+                    return existing["id"], False
+            
+            # Generate a new ID (cold memories keep their IDs, so never reuse one)
+            new_id = self._next_id
+            self._next_id += 1
+            
+            # Create memory object
+            memory = {
+                "id": new_id,
+                "content": content,
+                "tags": tags,
+                "source": source,
+                "created_at": datetime.now().isoformat(),
+                "last_accessed": datetime.now().isoformat()
+            }
+            
+            # Add to memories list
+            self.memories.append(memory)
+            self.memory_ids.append(new_id)
+            self._memory_by_id[new_id] = memory
+            self._reschedule(memory)
+            self._stats.added(memory, self.memories)
+            self._index_content(memory, signature=signature)
+            
+            # Add to vector index
+            vector = self._vectorize_text(content)
+            self.index.add(vector)
+            self._append_embeddings(vector)
+            
+            # A PQ store that has grown enough to train its codebooks switches from the exact index
+            if self.index_type == "pq" and self._index_needs_rebuild():
+                self._rebuild_index()
+            
+            # Save changes
+            self.save_memories()
+            self.save_index()
+            
+            # Keep the hot tier within the retention policy
+            self.schedule_retention()
         
-        return new_id
+        return new_id, True
     
-    def search_memories(self, query, k=5):
+    @timed("vector_memory_search")
+    def search_memories(self, query, k=5, include_cold=False):
         """Search memories by semantic similarity"""
-        # Convert query to vector
-        query_vector = self._vectorize_text(query)
-        
-        # Search the index
-        if self.index.ntotal == 0:
-            return []  # No memories to search
+        with self._lock:
+            # Nothing has been stored yet; fitting the vectorizer on the query would freeze its vocabulary
+            if not hasattr(self.vectorizer, 'vocabulary_'):
+                return []
             
-        distances, indices = self.index.search(query_vector, min(k, self.index.ntotal))
-        
-        # Get the corresponding memories
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.memories):
-                # Update last accessed time
-                self.memories[idx]["last_accessed"] = datetime.now().isoformat()
-                
-                # Add distance score
-                memory = dict(self.memories[idx])
-                memory["relevance_score"] = float(1.0 / (1.0 + distances[0][i]))  # Convert to similarity score
+            # Convert query to vector
+            query_vector = self._vectorize_text(query)
+            
+            results = []
+            if self.index.ntotal > 0:
+                # Over-fetch from a compressed index and re-rank the candidates exactly
+                rerank = self.rerank and not isinstance(self.index, faiss.IndexFlat) and self._embedding_rows() > 0
+                fetch = k * Config.MEMORY_RERANK_FACTOR if rerank else k
+                distances, indices = self.index.search(query_vector, min(fetch, self.index.ntotal))
+                if rerank:
+                    distances, indices = self._rerank(query_vector, indices[0], k)
                 
-                results.append(memory)
-        
-        # Sort by relevance score
-        results.sort(key=lambda x: x["relevance_score"], reverse=True)
-        
-        # Save updated access times
-        if results:
-            self.save_memories()
+                # Get the corresponding memories
+                for i, idx in enumerate(indices[0]):
+                    if 0 <= idx < len(self.memories):
+                        # Update last accessed time
+                        self._touch(self.memories[idx])
+                        
+                        # Add distance score
+                        memory = dict(self.memories[idx])
+                        memory["relevance_score"] = float(1.0 / (1.0 + distances[0][i]))  # Convert to similarity score
+                        
+                        results.append(memory)
+            
+            # Save updated access times
+            if results:
+                self.save_memories()
             
-        return results
+            # The cold tier is only scanned when explicitly requested
+            if include_cold:
+                results.extend(self.search_cold_memories(query, k, query_vector=query_vector))
+            
+            # Sort by relevance score
+            results.sort(key=lambda x: x["relevance_score"], reverse=True)
+            return results[:k]
+    
+    @timed("vector_memory_search_cold")
+    def search_cold_memories(self, query, k=5, query_vector=None):
+        """Brute-force search over the cold tier (not indexed)"""
+        with self._lock:
+            if not self.cold_memories:
+                return []
+            if query_vector is None:
+                query_vector = self._vectorize_text(query)
+            
+            vectors = self.vectorizer.transform([mem["content"] for mem in self.cold_memories]).toarray().astype('float32')
+            if vectors.shape[1] != self.dimension:
+                padded = np.zeros((vectors.shape[0], self.dimension), dtype=np.float32)
+                copy_dim = min(vectors.shape[1], self.dimension)
+                padded[:, :copy_dim] = vectors[:, :copy_dim]
+                vectors = padded
+            distances = ((vectors - query_vector) ** 2).sum(axis=1)
+            
+            results = []
+            for idx in np.argsort(distances)[:k]:
+                memory = dict(self.cold_memories[idx])
+                memory["relevance_score"] = float(1.0 / (1.0 + distances[idx]))
+                memory["tier"] = "cold"
+                results.append(memory)
+            return results
     
     def search_by_tag(self, tag):
         """Search memories by tag"""
-        results = []
-        for memory in self.memories:
-            if tag in memory["tags"]:
-                # Update last accessed time
-                memory["last_accessed"] = datetime.now().isoformat()
-                results.append(memory)
-        
-        # Save updated access times
-        if results:
-            self.save_memories()
+        with self._lock:
+            results = []
+            for memory in self.memories:
+                if tag in memory["tags"]:
+                    # Update last accessed time
+                    self._touch(memory)
+                    results.append(memory)
             
-        return results
+            # Save updated access times
+            if results:
+                self.save_memories()
+            
+            return results
     
     def get_memory_by_id(self, memory_id):
         """Get a specific memory by ID"""
-        for memory in self.memories:
-            if memory["id"] == memory_id:
-                # Update last accessed time
-                memory["last_accessed"] = datetime.now().isoformat()
-                self.save_memories()
-                return memory
-        return None
+        with self._lock:
+            memory = self._memory_by_id.get(memory_id)
+            if memory is None:
+                return None
+            # Update last accessed time
+            self._touch(memory)
+            self.save_memories()
+            return memory
+    
+    def record_access(self, accessed):
+        """Apply access times recorded elsewhere (memory ID -> ISO timestamp); returns how many moved forward.
+
+        Malformed and future timestamps are ignored. Only the retention heaps
+        and stats change right away; the memories file is written by
+        persist_access_times() on the retention worker's timer.
+        """
+        now = datetime.now()
+        with self._lock:
+            updated = 0
+            for memory_id, timestamp in accessed.items():
+                try:
+                    accessed_at = datetime.fromisoformat(timestamp)
+                except (TypeError, ValueError):
+                    continue
+                if accessed_at.tzinfo is not None:
+                    accessed_at = accessed_at.astimezone().replace(tzinfo=None)
+                if accessed_at > now:
+                    continue
+                memory = self._memory_by_id.get(memory_id)
+                if memory is not None and accessed_at.isoformat() > memory["last_accessed"]:
+                    self._touch(memory, accessed_at.isoformat())
+                    updated += 1
+            if updated:
+                self._unsaved_access = True
+            return updated
+    
+    def persist_access_times(self):
+        """Write access times applied by record_access (no-op when there are none)"""
+        with self._lock:
+            if not self._unsaved_access:
+                return
+            self._unsaved_access = False
+            # Not save_memories: access times alone are not worth publishing a new snapshot
+            self._write_memories_file()
     
+    @timed("vector_memory_update")
     def update_memory(self, memory_id, content=None, tags=None):
         """Update an existing memory"""
-        for i, memory in enumerate(self.memories):
-            if memory["id"] == memory_id:
-                # Update content if provided
-                if content is not None:
-                    memory["content"] = content
-                    
-                    # Update vector in index
-                    vector = self._vectorize_text(content)
-                    
-                    # For simplicity, we'll rebuild the index
-                    # In a production system, you might want a more efficient approach
-                    self._rebuild_index()
-                
-                # Update tags if provided
-                if tags is not None:
-                    memory["tags"] = tags
-                
-                # Update last modified time
-                memory["last_accessed"] = datetime.now().isoformat()
-                
-                # Save changes
-                self.save_memories()
-                self.save_index()
-                
-                return True
+        with self._lock:
+            memory = self._memory_by_id.get(memory_id)
+            if memory is None:
+                return False
+            
+            # Update content if provided
+            if content is not None:
+                self._unindex_content(memory)
+                memory["content"] = content
+                self._index_content(memory)
                 
-        return False
+                # For simplicity, we'll rebuild the index
+                # In a production system, you might want a more efficient approach
+                # (with MEMORY_INDEX_TYPE "pq" this also retrains the codebooks on every content update)
+                self._rebuild_index()
+            
+            # Update tags if provided; pin state may have changed
+            if tags is not None:
+                self._stats.retagged(memory["tags"], tags)
+                memory["tags"] = tags
+                self._reschedule(memory)
+            
+            # Update last modified time
+            self._touch(memory)
+            
+            # Save changes
+            self.save_memories()
+            self.save_index()
+            
+            return True
     
+    @timed("vector_memory_delete")
     def delete_memory(self, memory_id):
         """Delete a memory"""
-        for i, memory in enumerate(self.memories):
-            if memory["id"] == memory_id:
-                # Remove from memories list
-                self.memories.pop(i)
-                self.memory_ids.remove(memory_id)
-                
-                # Rebuild index
-                self._rebuild_index()
+        with self._lock:
+            if memory_id in self._memory_by_id:
+                self._remove_from_hot_tier([memory_id])
                 
                 # Save changes
                 self.save_memories()
                 self.save_index()
-                
                 return True
-                
-        return False
+            
+            # Demoted memories can be deleted too
+            for i, memory in enumerate(self.cold_memories):
+                if memory["id"] == memory_id:
+                    self.cold_memories.pop(i)
+                    self.save_cold_memories()
+                    return True
+            
+            return False
     
     def add_tag_to_memory(self, memory_id, tag):
         """Add a tag to a memory"""
-        for memory in self.memories:
-            if memory["id"] == memory_id:
-                if tag not in memory["tags"]:
-                    memory["tags"].append(tag)
-                    memory["last_accessed"] = datetime.now().isoformat()
-                    self.save_memories()
-                return True
-        return False
+        with self._lock:
+            memory = self._memory_by_id.get(memory_id)
+            if memory is None:
+                return False
+            if tag not in memory["tags"]:
+                memory["tags"].append(tag)
+                self._stats.retagged([], [tag])
+                self._reschedule(memory)
+                self._touch(memory)
+                self.save_memories()
+            return True
     
     def get_all_memories(self):
         """Get all memories"""
-        return self.memories
+        with self._lock:
+            return list(self.memories)
     
-    def get_memory_stats(self):
-        """Get statistics about the memories"""
-        stats = {
-            "total_memories": len(self.memories),
-            "total_tags": len(set(tag for memory in self.memories for tag in memory["tags"])),
-            "tags_frequency": {},
-            "newest_memory": None,
-            "oldest_memory": None,
-            "most_accessed_memory": None
-        }
-        
-        # Calculate tag frequencies
-        all_tags = [tag for memory in self.memories for tag in memory["tags"]]
-        for tag in set(all_tags):
-            stats["tags_frequency"][tag] = all_tags.count(tag)
-        
-        # Find newest and oldest memories
-        if self.memories:
-            sorted_by_creation = sorted(self.memories, key=lambda x: x["created_at"])
-            stats["oldest_memory"] = sorted_by_creation[0]
-            stats["newest_memory"] = sorted_by_creation[-1]
+    @staticmethod
+    def _project(memory, fields=None, max_content_length=None):
+        """Copy a memory keeping only the requested fields, optionally truncating content"""
+        projected = {key: memory[key] for key in fields if key in memory} if fields else dict(memory)
+        if max_content_length is not None and "content" in projected and len(projected["content"]) > max_content_length:
+            projected["content"] = projected["content"][:max_content_length] + "..."
+        return projected
+    
+    def get_memories_page(self, cursor=None, limit=50, fields=None, max_content_length=None, tag=None):
+        """Get one page of memories ordered by ID; cursor is the last ID of the previous page"""
+        with self._lock:
+            # IDs are assigned in increasing order, so the cursor position is a binary search
+            start = bisect_right(self.memory_ids, cursor) if cursor is not None else 0
+            page = []
+            position = start
+            while position < len(self.memories) and len(page) < limit:
+                memory = self.memories[position]
+                position += 1
+                if tag is None or tag in memory["tags"]:
+                    page.append(self._project(memory, fields, max_content_length))
             
-            # Find most accessed memory
-            sorted_by_access = sorted(self.memories, key=lambda x: x["last_accessed"], reverse=True)
-            stats["most_accessed_memory"] = sorted_by_access[0]
-        
-        return stats
+            has_more = position < len(self.memories)
+            next_cursor = self.memory_ids[position - 1] if page and has_more else None
+            return {"memories": page, "next_cursor": next_cursor}
+    
+    def iter_memories(self, fields=None, max_content_length=None, tag=None, batch_size=100):
+        """Yield memories one page at a time without holding the lock between pages"""
+        cursor = None
+        while True:
+            page = self.get_memories_page(cursor, batch_size, fields, max_content_length, tag)
+            yield from page["memories"]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return
+    
+    def get_memory_stats(self):
+        """Get statistics about the memories (maintained incrementally)"""
+        with self._lock:
+            return self._stats.snapshot(self._memory_by_id)
+    
+    def get_storage_stats(self):
+        """Get index size and on-disk footprint of the store"""
+        with self._lock:
+            files = {
+                "memory_file": self.memory_file,
+                "index_file": self.index_file,
+                "vectorizer_file": self.vectorizer_file,
+                "cold_memory_file": self.cold_memory_file,
+                "embedding_file": self.embedding_file
+            }
+            bytes_on_disk = {name: os.path.getsize(path) if os.path.exists(path) else 0 for name, path in files.items()}
+            return {
+                "index_type": self.index_type,
+                "index_size": self.index.ntotal,
+                "cold_memories": len(self.cold_memories),
+                "bytes_on_disk": bytes_on_disk,
+                "total_bytes_on_disk": sum(bytes_on_disk.values())
+            }